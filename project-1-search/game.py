@@ -368,6 +368,86 @@ class Actions:
         return (x + dx, y + dy)
     getSuccessor = staticmethod(getSuccessor)
 
+
+class ActionTable:
+    """
+    Precomputed movement information for every cell of a wall grid.
+
+    Cells are numbered x * height + y.  For each cell the table stores the
+    actions Actions.getPossibleActions allows there, the moves left to an
+    agent that may neither stop nor reverse (indexed by its current
+    direction) and the (action, successor) pairs in the north/south/east/west
+    order the search problems use.  The answers only hold for agents
+    standing on a grid point, so positions in between fall back to the
+    Actions computations.
+    """
+    SEARCH_ORDER = [Directions.NORTH, Directions.SOUTH,
+                    Directions.EAST, Directions.WEST]
+
+    def __init__(self, walls):
+        self.width = walls.width
+        self.height = walls.height
+        self.possibleActions = []
+        self.nonReversingActions = []
+        self.moves = []
+        for x in range(self.width):
+            for y in range(self.height):
+                possible = []
+                successors = {}
+                for direction, (dx, dy) in Actions._directionsAsList:
+                    nextX, nextY = x + dx, y + dy
+                    if 0 <= nextX < self.width and 0 <= nextY < self.height and not walls[nextX][nextY]:
+                        possible.append(direction)
+                        successors[direction] = (nextX, nextY)
+                self.possibleActions.append(tuple(possible))
+                self.moves.append(tuple((direction, successors[direction])
+                                        for direction in ActionTable.SEARCH_ORDER if direction in successors))
+                nonReversing = {}
+                for direction in Actions._directions:
+                    actions = [a for a in possible if a != Directions.STOP]
+                    reverse = Actions.reverseDirection(direction)
+                    if reverse in actions and len(actions) > 1:
+                        actions.remove(reverse)
+                    nonReversing[direction] = tuple(actions)
+                self.nonReversingActions.append(nonReversing)
+
+    def _index(self, position):
+        """
+        Returns the cell index of a position on a grid point, or None.
+        """
+        x, y = position
+        x_int, y_int = int(x + 0.5), int(y + 0.5)
+        if abs(x - x_int) + abs(y - y_int) > Actions.TOLERANCE:
+            return None
+        return x_int * self.height + y_int
+
+    def getPossibleActions(self, config):
+        index = self._index(config.pos)
+        if index is None:
+            # In between grid points, all agents must continue straight
+            return [config.getDirection()]
+        return list(self.possibleActions[index])
+
+    def getNonReversingActions(self, config):
+        """
+        The legal moves of an agent that cannot stop, and cannot turn around
+        unless it reaches a dead end.
+        """
+        index = self._index(config.pos)
+        if index is None:
+            actions = [config.getDirection()]
+            if Directions.STOP in actions:
+                actions.remove(Directions.STOP)
+            return actions
+        return list(self.nonReversingActions[index][config.direction])
+
+    def getMoves(self, position):
+        """
+        Returns the (action, nextPosition) pairs for an integer position.
+        """
+        x, y = position
+        return self.moves[x * self.height + y]
+
 class GameStateData:
     """
 
@@ -544,24 +624,16 @@ class Game:
         self.agentCrashed = True
         self.rules.agentCrash(self, agentIndex)
 
-    OLD_STDOUT = None
-    OLD_STDERR = None
-
+    # Agents print to their own output through a redirection local to the
+    # thread playing the game, so concurrent games do not swap each
+    # other's streams
     def mute(self, agentIndex):
         if not self.muteAgents: return
-        global OLD_STDOUT, OLD_STDERR
-        import io
-        OLD_STDOUT = sys.stdout
-        OLD_STDERR = sys.stderr
-        sys.stdout = self.agentOutput[agentIndex]
-        sys.stderr = self.agentOutput[agentIndex]
+        redirectOutput(self.agentOutput[agentIndex])
 
     def unmute(self):
         if not self.muteAgents: return
-        global OLD_STDOUT, OLD_STDERR
-        # Revert stdout/stderr to originals
-        sys.stdout = OLD_STDOUT
-        sys.stderr = OLD_STDERR
+        redirectOutput(None)
 
 
     def run( self ):
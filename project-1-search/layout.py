@@ -14,11 +14,13 @@
 
 from util import manhattanDistance
 from game import Grid
+from game import ActionTable
 import os
 import random
 from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
+ACTION_TABLE_CACHE = {}
 
 class Layout:
     """
@@ -36,11 +38,23 @@ class Layout:
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
+        self._actionTable = None
         # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
         return self.numGhosts
 
+    def getActionTable(self):
+        """
+        Returns the game.ActionTable for these walls, building it on first use.
+        Layouts with the same walls share one table.
+        """
+        if self._actionTable is None:
+            if self.walls not in ACTION_TABLE_CACHE:
+                ACTION_TABLE_CACHE[self.walls.copy()] = ActionTable(self.walls)
+            self._actionTable = ACTION_TABLE_CACHE[self.walls]
+        return self._actionTable
+
     def initializeVisibilityMatrix(self):
         global VISIBILITY_MATRIX_CACHE
         if reduce(str.__add__, self.layoutText) not in VISIBILITY_MATRIX_CACHE:
@@ -0,0 +1,275 @@
+# layoutGenerator.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Random maze layouts of any size, for testing how agents scale.
+
+A generated layout is a maze carved by a randomized depth-first search, so
+every open cell can be reached from every other.  Then:
+  - loopFactor is the chance that each wall between two corridors is
+    knocked down, which adds cycles (0 keeps a perfect maze)
+  - wallDensity, if given, is the largest fraction of the inner cells that
+    may be walls; walls next to open cells are knocked down until it holds
+  - Pacman, numGhosts ghosts and numCapsules capsules are put on distinct
+    open cells, and each other open cell holds food with probability
+    foodDensity
+The same arguments and seed always give the same layout.
+
+  > layout = generateLayout(500, 500, numGhosts=200, seed=1)
+  > LayoutGenerator(5000, 5000, seed=1).writeLayout('layouts/huge.lay')
+
+The pacman.py and busters.py command lines take --generate with the same
+arguments, e.g. --generate width=500,height=500,loopFactor=0.3,seed=1, and
+gridworld.py turns a generated maze into a grid (see getGeneratedGrid).
+Run this file to write a layout:
+
+  > python layoutGenerator.py --width 500 --height 500 -o layouts/big.lay
+"""
+
+import random
+import sys
+
+WALL = ord('%')
+OPEN = ord(' ')
+FOOD = ord('.')
+CAPSULE = ord('o')
+GHOST = ord('G')
+PACMAN = ord('P')
+
+# The types of the generator arguments, for parsing them from strings
+ARGUMENT_TYPES = {'width': int, 'height': int, 'wallDensity': float,
+                  'loopFactor': float, 'foodDensity': float,
+                  'numCapsules': int, 'numGhosts': int, 'seed': int}
+
+
+class LayoutGenerator:
+    """
+    Generates the text of a random maze layout (see the module docstring).
+    The maze is built once, as one byte per cell, and its rows can then be
+    parsed into a Layout or streamed into a .lay file.
+    """
+
+    def __init__(self, width, height, wallDensity=None, loopFactor=0.2, foodDensity=0.5,
+                 numCapsules=4, numGhosts=2, seed=None):
+        if width < 3 or height < 3:
+            raise Exception('Generated layouts must be at least 3x3')
+        self.width = width
+        self.height = height
+        self.wallDensity = wallDensity
+        self.loopFactor = loopFactor
+        self.foodDensity = foodDensity
+        self.numCapsules = numCapsules
+        self.numGhosts = numGhosts
+        self.seed = seed
+        self.cells = None
+
+    def getRows(self):
+        """
+        The layout text as a list of bytearrays, the top row first.
+        """
+        if self.cells is None:
+            self.cells = self._generate()
+        width = self.width
+        return [self.cells[y * width:(y + 1) * width] for y in range(self.height)]
+
+    def getLayoutText(self):
+        return [row.decode('ascii') for row in self.getRows()]
+
+    def getLayout(self):
+        import layout
+        return layout.Layout(self.getLayoutText())
+
+    def writeLayout(self, fileName):
+        """
+        Writes the layout to a .lay file one row at a time.
+        """
+        if self.cells is None:
+            self.cells = self._generate()
+        width = self.width
+        with open(fileName, 'wb') as out:
+            for y in range(self.height):
+                out.write(self.cells[y * width:(y + 1) * width])
+                out.write(b'\n')
+
+    def _generate(self):
+        rng = random.Random(self.seed)
+        cells = bytearray([WALL]) * (self.width * self.height)
+        self._carveMaze(cells, rng)
+        self._addLoops(cells, rng)
+        if self.wallDensity is not None:
+            self._thinWalls(cells, rng)
+        self._placeItems(cells, rng)
+        return cells
+
+    def _carveMaze(self, cells, rng):
+        """
+        A randomized depth-first search over the cells with odd coordinates,
+        opening the wall between each cell and the one it is reached from.
+        """
+        width = self.width
+        lastX, lastY = self.width - 2, self.height - 2
+        start = width + 1
+        cells[start] = OPEN
+        stack = [start]
+        steps = [(2, 1), (-2, -1), (2 * width, width), (-2 * width, -width)]
+        while stack:
+            cell = stack[-1]
+            x, y = cell % width, cell // width
+            unvisited = []
+            for step, half in steps:
+                nx, ny = (cell + step) % width, (cell + step) // width
+                if abs(nx - x) <= 2 and 1 <= nx <= lastX and 1 <= ny <= lastY \
+                        and cells[cell + step] == WALL:
+                    unvisited.append((step, half))
+            if not unvisited:
+                stack.pop()
+                continue
+            step, half = rng.choice(unvisited)
+            cells[cell + half] = OPEN
+            cells[cell + step] = OPEN
+            stack.append(cell + step)
+
+    def _addLoops(self, cells, rng):
+        """
+        Knocks down each wall between two open cells (in a row or a column)
+        with probability loopFactor.
+        """
+        if self.loopFactor <= 0:
+            return
+        width = self.width
+        for y in range(1, self.height - 1):
+            for x in range(1 + y % 2, self.width - 1, 2):
+                cell = y * width + x
+                if cells[cell] != WALL:
+                    continue
+                if (cells[cell - 1] == OPEN and cells[cell + 1] == OPEN) or \
+                        (cells[cell - width] == OPEN and cells[cell + width] == OPEN):
+                    if rng.random() < self.loopFactor:
+                        cells[cell] = OPEN
+
+    def _thinWalls(self, cells, rng):
+        """
+        Knocks down random inner walls next to open cells until at most
+        wallDensity of the inner cells are walls.  Only walls touching an
+        open cell go, so everything stays connected.
+        """
+        width = self.width
+        inner = [y * width + x for y in range(1, self.height - 1)
+                 for x in range(1, self.width - 1)]
+        walls = [cell for cell in inner if cells[cell] == WALL]
+        excess = len(walls) - int(self.wallDensity * len(inner))
+        while excess > 0:
+            rng.shuffle(walls)
+            remaining = []
+            for cell in walls:
+                if excess > 0 and OPEN in (cells[cell - 1], cells[cell + 1],
+                                           cells[cell - width], cells[cell + width]):
+                    cells[cell] = OPEN
+                    excess -= 1
+                else:
+                    remaining.append(cell)
+            if len(remaining) == len(walls):
+                break
+            walls = remaining
+
+    def _placeItems(self, cells, rng):
+        numItems = 1 + self.numGhosts + self.numCapsules
+        openCells = [cell for cell in range(len(cells)) if cells[cell] == OPEN]
+        if numItems > len(openCells):
+            raise Exception('A %dx%d maze has %d open cells, too few for Pacman, %d ghosts and %d capsules'
+                            % (self.width, self.height, len(openCells), self.numGhosts, self.numCapsules))
+        chosen = rng.sample(openCells, numItems)
+        cells[chosen[0]] = PACMAN
+        for cell in chosen[1:1 + self.numGhosts]:
+            cells[cell] = GHOST
+        for cell in chosen[1 + self.numGhosts:]:
+            cells[cell] = CAPSULE
+        if self.foodDensity > 0:
+            for cell in openCells:
+                if cells[cell] == OPEN and rng.random() < self.foodDensity:
+                    cells[cell] = FOOD
+
+
+def generateLayout(width, height, **kwargs):
+    """
+    A Layout generated by LayoutGenerator(width, height, **kwargs).
+    """
+    return LayoutGenerator(width, height, **kwargs).getLayout()
+
+
+def parseGeneratorArgs(str, defaults={}):
+    """
+    Turns "width=500,height=500,seed=1" into the keyword arguments of
+    LayoutGenerator, on top of the given defaults.
+    """
+    args = dict(defaults)
+    for piece in str.split(','):
+        if not piece:
+            continue
+        if '=' not in piece:
+            raise Exception('Generator arguments look like name=value, not ' + piece)
+        key, val = piece.split('=')
+        if key not in ARGUMENT_TYPES:
+            raise Exception('Unknown generator argument %s (the arguments are %s)'
+                            % (key, ', '.join(sorted(ARGUMENT_TYPES))))
+        args[key] = ARGUMENT_TYPES[key](val)
+    for key in ['width', 'height']:
+        if key not in args:
+            raise Exception('Generated layouts need a ' + key)
+    return args
+
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python layoutGenerator.py <options>
+    EXAMPLES:   (1) python layoutGenerator.py --width 500 --height 500 --numGhosts 100 -o layouts/big.lay
+                    - writes a 500x500 maze with 100 ghosts
+                (2) python layoutGenerator.py --width 40 --height 20 --loopFactor 0.5
+                    - prints a small maze with many loops
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('--width', dest='width', type='int', default=41,
+                      help='the WIDTH of the layout [Default: %default]', metavar='WIDTH')
+    parser.add_option('--height', dest='height', type='int', default=21,
+                      help='the HEIGHT of the layout [Default: %default]', metavar='HEIGHT')
+    parser.add_option('--wallDensity', dest='wallDensity', type='float', default=None,
+                      help='the largest fraction of inner cells that are walls')
+    parser.add_option('--loopFactor', dest='loopFactor', type='float', default=0.2,
+                      help='the chance of knocking down each wall between corridors [Default: %default]')
+    parser.add_option('--foodDensity', dest='foodDensity', type='float', default=0.5,
+                      help='the chance that an open cell holds food [Default: %default]')
+    parser.add_option('--numCapsules', dest='numCapsules', type='int', default=4,
+                      help='the number of capsules [Default: %default]')
+    parser.add_option('-k', '--numGhosts', dest='numGhosts', type='int', default=2,
+                      help='the number of ghosts [Default: %default]')
+    parser.add_option('--seed', dest='seed', type='int', default=None,
+                      help='the random SEED', metavar='SEED')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='write the layout to FILE instead of printing it', metavar='FILE')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    generator = LayoutGenerator(options.width, options.height, options.wallDensity,
+                                options.loopFactor, options.foodDensity,
+                                options.numCapsules, options.numGhosts, options.seed)
+    if options.output != None:
+        generator.writeLayout(options.output)
+    else:
+        print('\n'.join(generator.getLayoutText()))
@@ -17,6 +17,8 @@ In search.py, you will implement generic search algorithms which are called by
 Pacman agents (in searchAgents.py).
 """
 
+from array import array
+
 import util
 
 class SearchProblem:
@@ -61,6 +63,26 @@ class SearchProblem:
         """
         util.raiseNotDefined()
 
+    # The bidirectional searches also need the two methods below, which most
+    # problems (those with many goal states) cannot provide.
+
+    def getGoalState(self):
+        """
+        Returns the one goal state of the search problem.
+        """
+        util.raiseNotDefined()
+
+    def getPredecessors(self, state):
+        """
+          state: Search state
+
+        Returns a list of triples, (predecessor, action, stepCost), where
+        'action' leads from 'predecessor' to the state and 'stepCost' is the
+        cost of that move.  In other words, the triples for which the state
+        is among the successors of 'predecessor'.
+        """
+        util.raiseNotDefined()
+
 
 def tinyMazeSearch(problem):
     """
@@ -72,6 +94,45 @@ def tinyMazeSearch(problem):
     w = Directions.WEST
     return  [s, s, w, s, w, w, s, w]
 
+class SearchNodes:
+    """
+    The nodes of a search tree, kept in parallel lists and referred to by
+    index.  Node i holds states[i], reached from node parents[i] by
+    actions[i] at path cost costs[i]; node 0 is the start and has no parent.
+
+    Frontiers hold node indices instead of copies of the action lists, so a
+    push costs the same at any depth.  The plan is only rebuilt (by
+    following the parents) for the goal node.  Path costs are stored as
+    floats.
+    """
+    def __init__(self, start_state):
+        # Parents and costs are packed arrays rather than lists of int and
+        # float objects
+        self.states = [start_state]
+        self.parents = array('q', [-1])
+        self.actions = [None]
+        self.costs = array('d', [0])
+
+    def add(self, state, parent, action, cost=0):
+        """Adds a child of node parent and returns its index."""
+        self.states.append(state)
+        self.parents.append(parent)
+        self.actions.append(action)
+        self.costs.append(cost)
+        return len(self.states) - 1
+
+    def getActions(self, node):
+        """The actions leading from the start to node."""
+        path = []
+        while node > 0:
+            path.append(self.actions[node])
+            node = self.parents[node]
+        path.reverse()
+        return path
+
+    def __len__(self):
+        return len(self.states)
+
 def depthFirstSearch(problem: SearchProblem):
     """
     Search the deepest nodes in the search tree first.
@@ -79,24 +140,25 @@ def depthFirstSearch(problem: SearchProblem):
     Your search algorithm needs to return a list of actions that reaches the
     goal. Make sure to implement a graph search algorithm.
     """
-    # Initialize the search_space with the start state
-    # The search_space in DFS is a Stack (LIFO)
+    # Initialize the search_space with the start node
+    # The search_space in DFS is a Stack (LIFO) of node indices
     search_space = util.Stack()
     
     # Keep track of visited states to avoid cycles
     visited = set()
     
-    # Push the initial state with an empty action list
-    start_state = problem.getStartState()
-    search_space.push((start_state, []))  # (state, actions_to_reach_state)
+    # The start state is node 0, with an empty action list
+    nodes = SearchNodes(problem.getStartState())
+    search_space.push(0)
     
     while not search_space.isEmpty():
         # Pop the deepest node from the stack
-        current_state, actions = search_space.pop()
+        node = search_space.pop()
+        current_state = nodes.states[node]
         
         # Check if we've reached the goal
         if problem.isGoalState(current_state):
-            return actions
+            return nodes.getActions(node)
         
         # Skip if we've already visited this state
         if current_state in visited:
@@ -108,45 +170,45 @@ def depthFirstSearch(problem: SearchProblem):
         # Get all possible successor states and actions
         for successor, action, step_cost in problem.getSuccessors(current_state):
             if successor not in visited:
-                # For each unvisited successor, add it to the search_space
-                # with the updated list of actions
-                new_actions = actions + [action]
-                search_space.push((successor, new_actions))
+                # For each unvisited successor, add a child node to the
+                # search_space
+                search_space.push(nodes.add(successor, node, action))
     
     # If no solution is found
     return []
 
 def breadthFirstSearch(problem: SearchProblem):
     """Search the shallowest nodes in the search tree first."""
-    # Initialize the search_space with the start state
-    # The search_space in BFS is a Queue (FIFO)
+    # Initialize the search_space with the start node
+    # The search_space in BFS is a Queue (FIFO) of node indices
     search_space = util.Queue()
     
     # Keep track of visited states to avoid cycles
     visited = set()
     
-    # Push the initial state with an empty action list
+    # The start state is node 0, with an empty action list
     start_state = problem.getStartState()
-    search_space.push((start_state, []))  # (state, actions_to_reach_state)
+    nodes = SearchNodes(start_state)
+    search_space.push(0)
     
     # Add the start state to visited set immediately
     visited.add(start_state)
     
     while not search_space.isEmpty():
         # Pop the shallowest node from the queue
-        current_state, actions = search_space.pop()
+        node = search_space.pop()
+        current_state = nodes.states[node]
         
         # Check if we've reached the goal
         if problem.isGoalState(current_state):
-            return actions
+            return nodes.getActions(node)
         
         # Get all possible successor states and actions
         for successor, action, step_cost in problem.getSuccessors(current_state):
             if successor not in visited:
-                # For each unvisited successor, add it to the search_space
-                # with the updated list of actions
-                new_actions = actions + [action]
-                search_space.push((successor, new_actions))
+                # For each unvisited successor, add a child node to the
+                # search_space
+                search_space.push(nodes.add(successor, node, action))
                 
                 # Mark as visited when added to search_space (to avoid duplicates)
                 visited.add(successor)
@@ -156,24 +218,26 @@ def breadthFirstSearch(problem: SearchProblem):
 
 def uniformCostSearch(problem: SearchProblem):
     """Search the node of least total cost first."""
-    # Initialize the search_space with the start state
-    # In UCS, we use a PriorityQueue where priority is the cumulative cost
+    # Initialize the search_space with the start node
+    # In UCS, we use a PriorityQueue of node indices where priority is the
+    # cumulative cost
     search_space = util.PriorityQueue()
     
     # Keep track of visited states to avoid cycles
     visited = set()
     
-    # Push the initial state with an empty action list and zero cost
-    start_state = problem.getStartState()
-    search_space.push((start_state, [], 0), 0)  # (state, actions, cumulative_cost), priority
+    # The start state is node 0, with an empty action list and zero cost
+    nodes = SearchNodes(problem.getStartState())
+    search_space.push(0, 0)
     
     while not search_space.isEmpty():
         # Pop the node with lowest cumulative cost
-        current_state, actions, cumulative_cost = search_space.pop()
+        node = search_space.pop()
+        current_state = nodes.states[node]
         
         # Check if we've reached the goal
         if problem.isGoalState(current_state):
-            return actions
+            return nodes.getActions(node)
         
         # Skip if we've already visited this state
         if current_state in visited:
@@ -183,14 +247,13 @@ def uniformCostSearch(problem: SearchProblem):
         visited.add(current_state)
         
         # Get all possible successor states, actions, and costs
+        cumulative_cost = nodes.costs[node]
         for successor, action, step_cost in problem.getSuccessors(current_state):
             if successor not in visited:
                 # Calculate new cumulative cost
                 new_cost = cumulative_cost + step_cost
-                # Create updated actions list
-                new_actions = actions + [action]
-                # Add to search_space with priority = cumulative cost
-                search_space.push((successor, new_actions, new_cost), new_cost)
+                # Add a child node to search_space with priority = cumulative cost
+                search_space.push(nodes.add(successor, node, action, new_cost), new_cost)
     
     # If no solution is found
     return []
@@ -204,27 +267,30 @@ def nullHeuristic(state, problem=None):
 
 def aStarSearch(problem: SearchProblem, heuristic=nullHeuristic):
     """Search the node that has the lowest combined cost and heuristic first."""
-    # Initialize the search space with the start state
-    # In A*, we use a PriorityQueue where priority is f(n) = g(n) + h(n)
+    # Initialize the search space with the start node
+    # In A*, we use a PriorityQueue of node indices where priority is
+    # f(n) = g(n) + h(n)
     # g(n) is the path cost so far, h(n) is the heuristic estimate to goal
     search_space = util.PriorityQueue()
     
     # Keep track of visited states to avoid cycles
     visited = set()
     
-    # Push the initial state with an empty action list and zero cost
+    # The start state is node 0, with an empty action list and zero cost
     start_state = problem.getStartState()
+    nodes = SearchNodes(start_state)
     # Calculate initial f(n) = g(n) + h(n) where g(n)=0 for start state
     start_heuristic = heuristic(start_state, problem)
-    search_space.push((start_state, [], 0), 0 + start_heuristic)  # (state, actions, g_cost), priority=f_cost
+    search_space.push(0, 0 + start_heuristic)
     
     while not search_space.isEmpty():
         # Pop the node with lowest f(n) = g(n) + h(n)
-        current_state, actions, g_cost = search_space.pop()
+        node = search_space.pop()
+        current_state = nodes.states[node]
         
         # Check if we've reached the goal
         if problem.isGoalState(current_state):
-            return actions
+            return nodes.getActions(node)
         
         # Skip if we've already visited this state
         if current_state in visited:
@@ -234,6 +300,7 @@ def aStarSearch(problem: SearchProblem, heuristic=nullHeuristic):
         visited.add(current_state)
         
         # Get all possible successor states, actions, and costs
+        g_cost = nodes.costs[node]
         for successor, action, step_cost in problem.getSuccessors(current_state):
             if successor not in visited:
                 # Calculate new g(n) - the cost so far
@@ -242,17 +309,443 @@ def aStarSearch(problem: SearchProblem, heuristic=nullHeuristic):
                 h_cost = heuristic(successor, problem)
                 # Calculate f(n) = g(n) + h(n)
                 f_cost = new_g_cost + h_cost
-                # Create updated actions list
-                new_actions = actions + [action]
-                # Add to search_space with priority = f_cost
-                search_space.push((successor, new_actions, new_g_cost), f_cost)
+                # Add a child node to search_space with priority = f_cost
+                search_space.push(nodes.add(successor, node, action, new_g_cost), f_cost)
     
     # If no solution is found
     return []
 
 
+class ReverseSearchProblem(SearchProblem):
+    """
+    The search problem of going backwards from the goal of a problem to its
+    start, following the moves of that problem in reverse.  The problem must
+    provide getGoalState and getPredecessors.
+
+    The successors of a state are its predecessors in the original problem,
+    with the original actions: a successor's action leads from the successor
+    to the state.  The start of the original problem is stored as goal, so
+    heuristics that read problem.goal (like manhattanHeuristic) estimate the
+    distance back to the start.  Any other attribute is looked up on the
+    original problem.
+    """
+    def __init__(self, problem):
+        self.problem = problem
+        self.startState = problem.getGoalState()
+        self.goal = problem.getStartState()
+
+    def getStartState(self):
+        return self.startState
+
+    def isGoalState(self, state):
+        return state == self.goal
+
+    def getSuccessors(self, state):
+        return self.problem.getPredecessors(state)
+
+    def getGoalState(self):
+        return self.goal
+
+    def getPredecessors(self, state):
+        return self.problem.getSuccessors(state)
+
+    def __getattr__(self, name):
+        return getattr(self.problem, name)
+
+def joinPlans(meeting_state, forward_parents, backward_parents):
+    """
+    The actions from the start through meeting_state to the goal.  Each
+    forward parent maps a state to the (previous state, action) that reached
+    it from the start, each backward parent to the (next state, action) that
+    leads from it towards the goal; the start and goal map to None.
+    """
+    plan = []
+    state = meeting_state
+    while forward_parents[state] is not None:
+        state, action = forward_parents[state]
+        plan.append(action)
+    plan.reverse()
+    state = meeting_state
+    while backward_parents[state] is not None:
+        state, action = backward_parents[state]
+        plan.append(action)
+    return plan
+
+def bidirectionalBreadthFirstSearch(problem: SearchProblem):
+    """
+    Search the shallowest nodes from the start and from the goal at once,
+    until the two searches meet.  Returns a plan with the fewest actions,
+    like breadthFirstSearch.  The problem must provide getGoalState and
+    getPredecessors.
+
+    Each round expands one whole layer of whichever side has the smaller
+    layer.  When a new state of the forward layer k+1 has already been
+    reached backwards (at depth at most j, the depth of the backward layer),
+    the path through it is at most k+1+j long; and as no state at forward
+    depth k or less was reached backwards, no path is shorter than k+1+j.
+    So the first meeting state found gives a shortest plan (the same holds
+    with the two sides swapped).
+    """
+    start_state = problem.getStartState()
+    goal_state = problem.getGoalState()
+    if problem.isGoalState(start_state):
+        return []
+
+    # Map every state reached on each side to the (state, action) it was
+    # reached from; this is also the visited set of that side
+    forward_parents = {start_state: None}
+    backward_parents = {goal_state: None}
+    forward_layer = [start_state]
+    backward_layer = [goal_state]
+
+    while forward_layer and backward_layer:
+        if len(forward_layer) <= len(backward_layer):
+            # Expand the forward layer, checking each new state against the
+            # backward search
+            next_layer = []
+            for state in forward_layer:
+                for successor, action, step_cost in problem.getSuccessors(state):
+                    if successor not in forward_parents:
+                        forward_parents[successor] = (state, action)
+                        if successor in backward_parents:
+                            return joinPlans(successor, forward_parents, backward_parents)
+                        next_layer.append(successor)
+            forward_layer = next_layer
+        else:
+            # Expand the backward layer; each predecessor's action leads
+            # from the predecessor back to state
+            next_layer = []
+            for state in backward_layer:
+                for predecessor, action, step_cost in problem.getPredecessors(state):
+                    if predecessor not in backward_parents:
+                        backward_parents[predecessor] = (state, action)
+                        if predecessor in forward_parents:
+                            return joinPlans(predecessor, forward_parents, backward_parents)
+                        next_layer.append(predecessor)
+            backward_layer = next_layer
+
+    # One side ran out of states without meeting the other
+    return []
+
+def bidirectionalAStarSearch(problem: SearchProblem, heuristic=nullHeuristic):
+    """
+    A* search from the start towards the goal and from the goal back towards
+    the start at once (front-to-end: each side's heuristic estimates the
+    distance to the far end).  Returns an optimal plan as long as the
+    heuristic is admissible in both directions.  The problem must provide
+    getGoalState and getPredecessors; the backward heuristic is
+    heuristic(state, ReverseSearchProblem(problem)).
+
+    Each step expands the side with the smaller frontier.  Whenever a state
+    has been reached from both sides, the path through it is a candidate
+    and the cheapest one is kept.  A path not found yet has to go through a
+    frontier state of each side (the forward one first), so its cost is at
+    least the lowest f value on either frontier, and at least the lowest
+    path cost on the forward frontier plus the lowest on the backward one.
+    Once the cheapest candidate costs no more than the largest of these
+    bounds it is optimal and the search stops.  A state whose path cost
+    improves goes back on its frontier, so the heuristic needs to be
+    admissible but not consistent.  Among states of equal f value the one
+    with the larger path cost is expanded first.
+    """
+    start_state = problem.getStartState()
+    if problem.isGoalState(start_state):
+        return []
+
+    # Index 0 is the forward search and index 1 the backward one, which
+    # searches the reversed problem.  Each search_space orders the frontier
+    # by (f, -g), and each g_space holds the same states ordered by g alone
+    problems = [problem, ReverseSearchProblem(problem)]
+    costs = [{}, {}]
+    parents = [{}, {}]
+    search_spaces = [util.IndexedPriorityQueue(), util.IndexedPriorityQueue()]
+    g_spaces = [util.IndexedPriorityQueue(), util.IndexedPriorityQueue()]
+    for side in [0, 1]:
+        root = problems[side].getStartState()
+        costs[side][root] = 0
+        parents[side][root] = None
+        search_spaces[side].push(root, (heuristic(root, problems[side]), 0))
+        g_spaces[side].push(root, 0)
+
+    # The cheapest path found so far, and the state where its halves meet
+    best_cost = float('inf')
+    meeting_state = None
+
+    while not search_spaces[0].isEmpty() and not search_spaces[1].isEmpty():
+        # Stop once no undiscovered path can be cheaper than the best one
+        f_bounds = [search_space.getPriority(search_space.peek())[0]
+                    for search_space in search_spaces]
+        g_bound = sum([g_space.getPriority(g_space.peek()) for g_space in g_spaces])
+        if best_cost <= max(f_bounds + [g_bound]):
+            break
+
+        # Expand the best state of the side with the smaller frontier
+        side = 0 if len(search_spaces[0]) <= len(search_spaces[1]) else 1
+        other = 1 - side
+        current_state = search_spaces[side].pop()
+        g_spaces[side].remove(current_state)
+        g_cost = costs[side][current_state]
+        for successor, action, step_cost in problems[side].getSuccessors(current_state):
+            new_g_cost = g_cost + step_cost
+            if new_g_cost < costs[side].get(successor, float('inf')):
+                costs[side][successor] = new_g_cost
+                parents[side][successor] = (current_state, action)
+                f_cost = new_g_cost + heuristic(successor, problems[side])
+                search_spaces[side].push(successor, (f_cost, -new_g_cost))
+                g_spaces[side].push(successor, new_g_cost)
+                # A new or cheaper path to a state the other side has
+                # reached is a new candidate
+                if successor in costs[other] and new_g_cost + costs[other][successor] < best_cost:
+                    best_cost = new_g_cost + costs[other][successor]
+                    meeting_state = successor
+
+    # If no solution is found
+    if meeting_state is None:
+        return []
+    return joinPlans(meeting_state, parents[0], parents[1])
+
+
+def iterativeDeepeningAStarSearch(problem: SearchProblem, heuristic=nullHeuristic, maxNodes=100000):
+    """
+    Iterative-deepening A*: depth-first searches that cut off every path
+    whose f(n) = g(n) + h(n) exceeds a bound.  The first bound is h(start)
+    and each next one is the smallest f value cut off by the search before.
+    Returns an optimal plan if the heuristic is admissible.
+
+    Memory holds the current path plus a table of at most maxNodes states
+    and the cheapest path cost each was reached at in this iteration; a
+    state reached again at no lower cost is not searched twice.  Once the
+    table is full, states not in it may be searched more than once, which
+    costs time but not memory.
+    """
+    start_state = problem.getStartState()
+    if problem.isGoalState(start_state):
+        return []
+
+    def children(state, g_cost):
+        # The successors of a state as (f, g, successor, action), most
+        # promising first; states on the current path are skipped
+        result = []
+        for successor, action, step_cost in problem.getSuccessors(state):
+            if successor not in on_path:
+                new_g_cost = g_cost + step_cost
+                result.append((new_g_cost + heuristic(successor, problem), new_g_cost, successor, action))
+        result.sort(key=lambda child: child[0])
+        return iter(result)
+
+    bound = heuristic(start_state, problem)
+    while True:
+        # The smallest f value above the bound, which becomes the next bound
+        next_bound = float('inf')
+        best_costs = {start_state: 0}
+        on_path = {start_state}
+        path_states = [start_state]
+        path_actions = []
+        # The children left to search at each depth of the current path
+        search_space = [children(start_state, 0)]
+
+        while search_space:
+            child = next(search_space[-1], None)
+            if child is None:
+                # Every child of the deepest state is done; back up
+                search_space.pop()
+                on_path.remove(path_states.pop())
+                if path_actions:
+                    path_actions.pop()
+                continue
+
+            f_cost, g_cost, successor, action = child
+            if f_cost > bound:
+                next_bound = min(next_bound, f_cost)
+                continue
+            if successor in on_path or best_costs.get(successor, float('inf')) <= g_cost:
+                continue
+            if problem.isGoalState(successor):
+                return path_actions + [action]
+            if successor in best_costs or len(best_costs) < maxNodes:
+                best_costs[successor] = g_cost
+
+            # Go one level deeper
+            on_path.add(successor)
+            path_states.append(successor)
+            path_actions.append(action)
+            search_space.append(children(successor, g_cost))
+
+        # If no solution is found
+        if next_bound == float('inf'):
+            return []
+        bound = next_bound
+
+class MemoryBoundedNode:
+    """
+    A node of the search tree kept by memoryBoundedAStarSearch.  f is a
+    lower bound on the cost of a plan through the node, backed up from its
+    children.  pending is None until the node is expanded, then holds the
+    successors that are not in memory as [f, successor, action, stepCost]
+    entries: those not generated yet and those forgotten to make room, with
+    the f value they had.
+    """
+    __slots__ = ['state', 'parent', 'action', 'step_cost', 'g', 'f', 'depth',
+                 'pending', 'children']
+
+    def __init__(self, state, parent, action, step_cost, g, f):
+        self.state = state
+        self.parent = parent
+        self.action = action
+        self.step_cost = step_cost
+        self.g = g
+        self.f = f
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.pending = None
+        self.children = []
+
+    def getActions(self):
+        """The actions leading from the start to this node."""
+        path = []
+        node = self
+        while node.parent is not None:
+            path.append(node.action)
+            node = node.parent
+        path.reverse()
+        return path
+
+def memoryBoundedAStarSearch(problem: SearchProblem, heuristic=nullHeuristic, maxNodes=100000):
+    """
+    Simplified memory-bounded A* (SMA*): A* that never keeps more than
+    maxNodes search nodes.  Each step generates one successor of the node
+    with the lowest f value (the deepest, among ties).  When memory is full,
+    the leaf with the highest f value (the shallowest, among ties) is
+    forgotten, and its parent remembers that f value so the leaf can be
+    generated again if it becomes the most promising one.  A successor is
+    not generated at all while memory holds a path to its state that costs
+    no more.  Returns an optimal plan if the heuristic is admissible and the
+    plan has at most maxNodes - 1 actions, and [] if no plan fits.
+    Memory must have room for at least the start node and one successor.
+    """
+    if maxNodes < 2:
+        raise Exception('SMA* needs room for at least 2 nodes, not %d' % maxNodes)
+    start_state = problem.getStartState()
+    root = MemoryBoundedNode(start_state, None, None, 0, 0, heuristic(start_state, problem))
+
+    # The frontier holds the nodes that can still generate a successor, the
+    # lowest f first; leaves holds the nodes without children in memory,
+    # the highest f first, to pick the one to forget
+    search_space = util.IndexedPriorityQueue()
+    leaves = util.IndexedPriorityQueue()
+    search_space.push(root, (root.f, 0))
+    leaves.push(root, (-root.f, 0))
+    num_nodes = 1
+    # The cheapest node in memory for each state
+    in_memory = {start_state: root}
+
+    def backUp(node):
+        # Recompute f from what is below node, then do the same for its
+        # ancestors for as long as the values change
+        while node is not None and node.pending is not None:
+            values = [entry[0] for entry in node.pending] + [child.f for child in node.children]
+            new_f = min(values) if values else float('inf')
+            if new_f == node.f:
+                break
+            node.f = new_f
+            if node in leaves:
+                leaves.push(node, (-node.f, node.depth))
+            node = node.parent
+
+    def forget(leaf):
+        # Remove leaf from memory, leaving an entry for it in its parent
+        parent = leaf.parent
+        if leaf in search_space:
+            search_space.remove(leaf)
+        leaves.remove(leaf)
+        if in_memory.get(leaf.state) is leaf:
+            del in_memory[leaf.state]
+        parent.children.remove(leaf)
+        parent.pending.append([leaf.f, leaf.state, leaf.action, leaf.step_cost])
+        search_space.push(parent, (min([entry[0] for entry in parent.pending]), -parent.depth))
+        if not parent.children:
+            leaves.push(parent, (-parent.f, parent.depth))
+
+    while not search_space.isEmpty():
+        node = search_space.peek()
+        if search_space.getPriority(node)[0] == float('inf'):
+            # No plan fits in memory
+            break
+
+        if node.pending is None:
+            if problem.isGoalState(node.state):
+                return node.getActions()
+            # Expand the node: every successor starts out pending, with its
+            # f value raised to at least the node's own (pathmax).  A
+            # successor too deep to ever be completed in memory gets an
+            # infinite f value instead
+            node.pending = []
+            for successor, action, step_cost in problem.getSuccessors(node.state):
+                if node.parent is not None and successor == node.parent.state:
+                    continue
+                if node.depth + 2 >= maxNodes and not problem.isGoalState(successor):
+                    f_cost = float('inf')
+                else:
+                    f_cost = max(node.f, node.g + step_cost + heuristic(successor, problem))
+                node.pending.append([f_cost, successor, action, step_cost])
+            if not node.pending:
+                # A dead end
+                node.f = float('inf')
+                search_space.remove(node)
+                if node.parent is not None:
+                    leaves.remove(node)
+                    if in_memory.get(node.state) is node:
+                        del in_memory[node.state]
+                    node.parent.children.remove(node)
+                    num_nodes -= 1
+                    if not node.parent.children:
+                        leaves.push(node.parent, (-node.parent.f, node.parent.depth))
+                    backUp(node.parent)
+                continue
+            backUp(node)
+
+        # Take the pending successor with the lowest f value, and generate
+        # it unless memory already has a path to its state at most as cheap
+        entry = min(node.pending, key=lambda entry: entry[0])
+        node.pending.remove(entry)
+        f_cost, successor, action, step_cost = entry
+        g_cost = node.g + step_cost
+        known = in_memory.get(successor)
+        if known is None or g_cost < known.g:
+            # Make room, never forgetting the node itself
+            if num_nodes >= maxNodes:
+                if node in leaves:
+                    leaves.remove(node)
+                    forget(leaves.peek())
+                    leaves.push(node, (-node.f, node.depth))
+                else:
+                    forget(leaves.peek())
+                num_nodes -= 1
+
+            child = MemoryBoundedNode(successor, node, action, step_cost, g_cost, f_cost)
+            node.children.append(child)
+            in_memory[successor] = child
+            num_nodes += 1
+            if node in leaves:
+                leaves.remove(node)
+            leaves.push(child, (-child.f, child.depth))
+            search_space.push(child, (child.f, -child.depth))
+
+        if node.pending:
+            search_space.push(node, (min([entry[0] for entry in node.pending]), -node.depth))
+        else:
+            search_space.remove(node)
+        backUp(node)
+
+    # If no solution is found
+    return []
+
+
 # Abbreviations
 bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
 ucs = uniformCostSearch
+bibfs = bidirectionalBreadthFirstSearch
+biastar = bidirectionalAStarSearch
+idastar = iterativeDeepeningAStarSearch
+smastar = memoryBoundedAStarSearch
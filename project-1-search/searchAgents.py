@@ -157,6 +157,7 @@ class PositionSearchProblem(search.SearchProblem):
         goal: A position in the gameState
         """
         self.walls = gameState.getWalls()
+        self.actionTable = gameState.data.layout.getActionTable()
         self.startState = gameState.getPacmanPosition()
         if start != None: self.startState = start
         self.goal = goal
@@ -197,14 +198,9 @@ class PositionSearchProblem(search.SearchProblem):
         """
 
         successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append( ( nextState, action, cost) )
+        for action, nextState in self.actionTable.getMoves(state):
+            cost = self.costFn(nextState)
+            successors.append( ( nextState, action, cost) )
 
         # Bookkeeping for display purposes
         self._expanded += 1 # DO NOT CHANGE
@@ -214,6 +210,30 @@ class PositionSearchProblem(search.SearchProblem):
 
         return successors
 
+    def getGoalState(self):
+        return self.goal
+
+    def getPredecessors(self, state):
+        """
+        Returns the positions one move away from state, the actions leading
+        from them to state, and the cost of stepping into state.  Moves
+        between grid points can always be reversed, so these are the
+        successors with the actions turned around.
+        """
+
+        cost = self.costFn(state)
+        predecessors = []
+        for action, previousState in self.actionTable.getMoves(state):
+            predecessors.append( ( previousState, Directions.REVERSE[action], cost) )
+
+        # Bookkeeping for display purposes
+        self._expanded += 1
+        if state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+
+        return predecessors
+
     def getCostOfActions(self, actions):
         """
         Returns the cost of a particular sequence of actions. If those actions
@@ -282,6 +302,7 @@ class CornersProblem(search.SearchProblem):
         Stores the walls, pacman's starting position and corners.
         """
         self.walls = startingGameState.getWalls()
+        self.actionTable = startingGameState.data.layout.getActionTable()
         self.startingPosition = startingGameState.getPacmanPosition()
         top, right = self.walls.height-2, self.walls.width-2
         self.corners = ((1,1), (1,top), (right, 1), (right, top))
@@ -319,26 +340,17 @@ class CornersProblem(search.SearchProblem):
         """
     
         successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            # Add a successor state to the successor list if the action is legal
-            # Here's a code snippet for figuring out whether a new position hits a wall:
-            position, corners_visited = state
-            x, y = position
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            hitsWall = self.walls[nextx][nexty]
-            
-            if not hitsWall:
-                nextPosition = (nextx, nexty)
-                
-                # Check if the new position is a corner and update corners_visited
-                new_corners_visited = list(corners_visited)
-                for i, corner in enumerate(self.corners):
-                    if nextPosition == corner:
-                        new_corners_visited[i] = True
-                
-                nextState = (nextPosition, tuple(new_corners_visited))
-                successors.append((nextState, action, 1))
+        position, corners_visited = state
+        # The layout's action table lists the moves that don't hit a wall
+        for action, nextPosition in self.actionTable.getMoves(position):
+            # Check if the new position is a corner and update corners_visited
+            new_corners_visited = list(corners_visited)
+            for i, corner in enumerate(self.corners):
+                if nextPosition == corner:
+                    new_corners_visited[i] = True
+
+            nextState = (nextPosition, tuple(new_corners_visited))
+            successors.append((nextState, action, 1))
     
         self._expanded += 1 # DO NOT CHANGE
         return successors
@@ -404,6 +416,7 @@ class FoodSearchProblem:
     def __init__(self, startingGameState: pacman.GameState):
         self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
         self.walls = startingGameState.getWalls()
+        self.actionTable = startingGameState.data.layout.getActionTable()
         self.startingGameState = startingGameState
         self._expanded = 0 # DO NOT CHANGE
         self.heuristicInfo = {} # A dictionary for the heuristic to store information
@@ -418,14 +431,10 @@ class FoodSearchProblem:
         "Returns successor states, the actions they require, and a cost of 1."
         successors = []
         self._expanded += 1 # DO NOT CHANGE
-        for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state[0]
-            dx, dy = Actions.directionToVector(direction)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
-                successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
+        for direction, (nextx, nexty) in self.actionTable.getMoves(state[0]):
+            nextFood = state[1].copy()
+            nextFood[nextx][nexty] = False
+            successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
         return successors
 
     def getCostOfActions(self, actions):
@@ -448,6 +457,27 @@ class AStarFoodSearchAgent(SearchAgent):
         self.searchFunction = lambda prob: search.aStarSearch(prob, foodHeuristic)
         self.searchType = FoodSearchProblem
 
+class IDAStarFoodSearchAgent(SearchAgent):
+    """
+    A SearchAgent for FoodSearchProblem using IDA* and your foodHeuristic.
+    At most maxNodes states are remembered between the depth-first searches
+    (e.g. -a maxNodes=20000).
+    """
+    def __init__(self, maxNodes=100000):
+        maxNodes = int(maxNodes)
+        self.searchFunction = lambda prob: search.iterativeDeepeningAStarSearch(prob, foodHeuristic, maxNodes)
+        self.searchType = FoodSearchProblem
+
+class SMAStarFoodSearchAgent(SearchAgent):
+    """
+    A SearchAgent for FoodSearchProblem using SMA* and your foodHeuristic,
+    keeping at most maxNodes search nodes in memory (e.g. -a maxNodes=20000).
+    """
+    def __init__(self, maxNodes=100000):
+        maxNodes = int(maxNodes)
+        self.searchFunction = lambda prob: search.memoryBoundedAStarSearch(prob, foodHeuristic, maxNodes)
+        self.searchType = FoodSearchProblem
+
 def foodHeuristic(state: Tuple[Tuple, List[List]], problem: FoodSearchProblem):
     """
     Your heuristic for the FoodSearchProblem goes here.
@@ -577,6 +607,7 @@ class AnyFoodSearchProblem(PositionSearchProblem):
 
         # Store info for the PositionSearchProblem (no need to change this)
         self.walls = gameState.getWalls()
+        self.actionTable = gameState.data.layout.getActionTable()
         self.startState = gameState.getPacmanPosition()
         self.costFn = lambda x: 1
         self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
@@ -607,4 +638,4 @@ def mazeDistance(point1: Tuple[int, int], point2: Tuple[int, int], gameState: pa
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
     prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
-    return len(search.bfs(prob))
+    return len(search.bibfs(prob))
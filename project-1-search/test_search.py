@@ -0,0 +1,118 @@
+# test_search.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Tests for the bidirectional and memory-bounded searches.  Run them from this
+directory with
+
+  > python -m unittest test_search
+"""
+
+import unittest
+
+import layout
+import pacman
+import search
+from searchAgents import CornersProblem
+from searchAgents import FoodSearchProblem
+from searchAgents import PositionSearchProblem
+from searchAgents import cornersHeuristic
+from searchAgents import foodHeuristic
+from searchAgents import manhattanHeuristic
+
+
+def startState(layoutName):
+    state = pacman.GameState()
+    state.initialize(layout.getLayout(layoutName), 0)
+    return state
+
+
+def positionProblem(layoutName):
+    return PositionSearchProblem(startState(layoutName), warn=False, visualize=False)
+
+
+def planCost(makeProblem, searchFunction, *args, **keyArgs):
+    """
+    The cost of the plan searchFunction finds, checked to reach the goal.
+    """
+    problem = makeProblem()
+    plan = searchFunction(problem, *args, **keyArgs)
+    state = problem.getStartState()
+    for action in plan:
+        successors = dict([(a, s) for s, a, c in problem.getSuccessors(state)])
+        state = successors[action]
+    assert problem.isGoalState(state), 'the plan does not reach the goal'
+    return problem.getCostOfActions(plan)
+
+
+class MemoryBoundedSearchTest(unittest.TestCase):
+
+    PROBLEMS = [
+        ('tinyMaze', lambda: positionProblem('tinyMaze'), manhattanHeuristic),
+        ('mediumMaze', lambda: positionProblem('mediumMaze'), manhattanHeuristic),
+        ('tinyCorners', lambda: CornersProblem(startState('tinyCorners')), cornersHeuristic),
+        ('tinySearch', lambda: FoodSearchProblem(startState('tinySearch')), foodHeuristic),
+    ]
+
+    def testMatchesAStarCost(self):
+        for name, makeProblem, heuristic in self.PROBLEMS:
+            optimal = planCost(makeProblem, search.astar, heuristic)
+            for searchFunction in [search.idastar, search.smastar]:
+                self.assertEqual(optimal, planCost(makeProblem, searchFunction, heuristic),
+                                 '%s on %s' % (searchFunction.__name__, name))
+
+    def testMatchesAStarCostInLittleMemory(self):
+        for name, makeProblem, heuristic in self.PROBLEMS:
+            optimal = planCost(makeProblem, search.astar, heuristic)
+            plan = search.astar(makeProblem(), heuristic)
+            for maxNodes in [len(plan) + 1, 2 * len(plan)]:
+                for searchFunction in [search.idastar, search.smastar]:
+                    self.assertEqual(optimal, planCost(makeProblem, searchFunction, heuristic,
+                                                       maxNodes=maxNodes),
+                                     '%s on %s with %d nodes' % (
+                                         searchFunction.__name__, name, maxNodes))
+
+    def testTinyBudgets(self):
+        for maxNodes in [0, 1]:
+            self.assertRaisesRegex(Exception, 'at least 2 nodes', search.smastar,
+                                   positionProblem('tinyMaze'), manhattanHeuristic, maxNodes)
+        self.assertEqual([], search.smastar(positionProblem('tinyMaze'), manhattanHeuristic, 2))
+        # The plan has 8 actions, so it needs 9 nodes
+        self.assertEqual([], search.smastar(positionProblem('tinyMaze'), manhattanHeuristic, 8))
+        self.assertEqual(8, len(search.smastar(positionProblem('tinyMaze'), manhattanHeuristic, 9)))
+        for maxNodes in [0, 1, 2]:
+            self.assertEqual(8, len(search.idastar(positionProblem('tinyMaze'),
+                                                   manhattanHeuristic, maxNodes)))
+
+
+class BidirectionalSearchTest(unittest.TestCase):
+
+    def testMatchesOneWayCost(self):
+        for name in ['tinyMaze', 'mediumMaze', 'bigMaze', 'contoursMaze', 'openMaze']:
+            makeProblem = lambda: positionProblem(name)
+            self.assertEqual(planCost(makeProblem, search.bfs),
+                             planCost(makeProblem, search.bibfs), name)
+            self.assertEqual(planCost(makeProblem, search.astar, manhattanHeuristic),
+                             planCost(makeProblem, search.biastar, manhattanHeuristic), name)
+
+    def testStartAtGoal(self):
+        state = startState('tinyMaze')
+        problem = PositionSearchProblem(state, goal=state.getPacmanPosition(),
+                                        warn=False, visualize=False)
+        self.assertEqual([], search.bibfs(problem))
+        self.assertEqual([], search.biastar(problem, manhattanHeuristic))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,314 @@
+# benchmark.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A benchmark suite for the game engine (game.py and pacman.py).
+
+For every layout in layouts/ it measures:
+  - successorsPerSecond: GameState.generateSuccessor calls per second, over
+    the states of a seeded random walk through the game
+  - legalActionsPerSecond: GameState.getLegalActions calls per second, over
+    the same states
+  - games: headless games per second (and moves per second) with RandomGhost
+    and with DirectionalGhost, Pacman being a GreedyAgent
+  - peakMemory: the largest number of bytes allocated while playing one game
+    with each kind of ghost, as reported by tracemalloc
+
+Rates are the best of --repeat rounds, each running for at least
+--minTime seconds.  Results are written as JSON, together with the code
+version, so that runs can be compared across changes:
+
+  > python benchmark.py -o before.json
+  > python benchmark.py -o after.json --compare before.json
+
+The script also runs against older revisions of the engine (copy it into
+their checkout), using trusted games and turning off explored-state tracking
+only where the revision has them.
+"""
+
+import inspect
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import layout as layoutModule
+import textDisplay
+from ghostAgents import DirectionalGhost
+from ghostAgents import RandomGhost
+from pacman import ClassicGameRules
+from pacman import GameState
+from pacmanAgents import GreedyAgent
+
+GHOST_TYPES = [('RandomGhost', RandomGhost),
+               ('DirectionalGhost', DirectionalGhost)]
+# Metrics where bigger is better, for --compare
+RATE_METRICS = ['successorsPerSecond', 'legalActionsPerSecond']
+# Whether the engine being measured can play trusted games
+TRUSTED_GAMES = 'trusted' in inspect.signature(ClassicGameRules.newGame).parameters
+
+
+def sampleStates(layout, numStates, seed):
+    """
+    The states of a random walk from the start of a game on layout, every
+    agent choosing uniformly among its legal actions.  Finished games start
+    over.
+    """
+    rng = random.Random(seed)
+    start = GameState()
+    start.initialize(layout, layout.getNumGhosts())
+    states = []
+    state = start
+    agentIndex = 0
+    while len(states) < numStates:
+        if state.isWin() or state.isLose():
+            state = start
+            agentIndex = 0
+        states.append(state)
+        action = rng.choice(state.getLegalActions(agentIndex))
+        state = state.generateSuccessor(agentIndex, action)
+        agentIndex = (agentIndex + 1) % state.getNumAgents()
+    return states
+
+
+def measureRate(function, operations, minTime, repeat):
+    """
+    Calls function() (which performs the given number of operations) until
+    minTime seconds have passed, repeat times, and returns the best rate in
+    operations per second.
+    """
+    best = 0.0
+    for i in range(repeat):
+        calls = 0
+        startTime = time.perf_counter()
+        elapsed = 0.0
+        while calls == 0 or elapsed < minTime:
+            function()
+            calls += 1
+            elapsed = time.perf_counter() - startTime
+        best = max(best, calls * operations / elapsed)
+    return best
+
+
+def benchmarkSuccessors(states, minTime, repeat):
+    moves = []
+    for state in states:
+        for agentIndex in range(state.getNumAgents()):
+            for action in state.getLegalActions(agentIndex):
+                moves.append((state, agentIndex, action))
+
+    def run():
+        for state, agentIndex, action in moves:
+            state.generateSuccessor(agentIndex, action)
+    return measureRate(run, len(moves), minTime, repeat)
+
+
+def benchmarkLegalActions(states, minTime, repeat):
+    queries = [(state, agentIndex) for state in states
+               for agentIndex in range(state.getNumAgents())]
+
+    def run():
+        for state, agentIndex in queries:
+            state.getLegalActions(agentIndex)
+    return measureRate(run, len(queries), minTime, repeat)
+
+
+def playGames(layout, ghostType, numGames, seed):
+    """
+    Plays numGames headless games (trusted ones, where the engine has them)
+    and returns the total number of moves made.
+    """
+    rules = ClassicGameRules()
+    options = {}
+    if TRUSTED_GAMES:
+        options['trusted'] = True
+    moves = 0
+    for i in range(numGames):
+        random.seed(seed + i)
+        ghosts = [ghostType(index + 1) for index in range(layout.getNumGhosts())]
+        game = rules.newGame(layout, GreedyAgent(), ghosts,
+                             textDisplay.NullGraphics(), True, **options)
+        game.run()
+        moves += len(game.moveHistory)
+    return moves
+
+
+def benchmarkGames(layout, ghostType, numGames, seed, repeat):
+    best = None
+    for i in range(repeat):
+        startTime = time.perf_counter()
+        moves = playGames(layout, ghostType, numGames, seed)
+        elapsed = time.perf_counter() - startTime
+        if best == None or elapsed < best[0]:
+            best = (elapsed, moves)
+    elapsed, moves = best
+    return {'gamesPerSecond': numGames / elapsed,
+            'movesPerSecond': moves / elapsed,
+            'averageMoves': moves / float(numGames)}
+
+
+def peakMemory(layout, ghostType, seed):
+    """
+    The peak number of bytes tracemalloc sees allocated while one game is
+    played (on top of what was allocated before it started).
+    """
+    tracemalloc.start()
+    try:
+        playGames(layout, ghostType, 1, seed)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmarkLayout(layout, numStates=200, numGames=3, minTime=0.5, repeat=3, seed=0):
+    """
+    Runs every benchmark on one layout and returns the results as a dict.
+    """
+    states = sampleStates(layout, numStates, seed)
+    result = {'width': layout.width, 'height': layout.height,
+              'numGhosts': layout.getNumGhosts(), 'food': layout.totalFood,
+              'successorsPerSecond': benchmarkSuccessors(states, minTime, repeat),
+              'legalActionsPerSecond': benchmarkLegalActions(states, minTime, repeat),
+              'games': {}, 'peakMemory': {}}
+    for name, ghostType in GHOST_TYPES:
+        result['games'][name] = benchmarkGames(layout, ghostType, numGames, seed, repeat)
+        result['peakMemory'][name] = peakMemory(layout, ghostType, seed)
+    return result
+
+
+def codeVersion():
+    """
+    The contents of VERSION and, if this is a git checkout, the revision.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    version = {'version': None, 'revision': None}
+    try:
+        with open(os.path.join(here, 'VERSION')) as f:
+            version['version'] = f.read().strip()
+    except IOError:
+        pass
+    try:
+        revision = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=here,
+                                           stderr=subprocess.DEVNULL)
+        version['revision'] = revision.decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return version
+
+
+def runBenchmarks(layoutNames=None, numStates=200, numGames=3, minTime=0.5, repeat=3, seed=0):
+    """
+    Benchmarks the given layouts (all of layouts/ by default) and returns the
+    report written by --output.
+    """
+    if hasattr(GameState, 'setExploredTracking'):
+        GameState.setExploredTracking('off')
+    if not layoutNames:
+        if hasattr(layoutModule, 'indexLayouts'):
+            fileNames = layoutModule.indexLayouts('layouts')
+        else:
+            fileNames = os.listdir('layouts')
+        layoutNames = sorted([name[:-len('.lay')]
+                              for name in fileNames if name.endswith('.lay')])
+    report = {'code': codeVersion(),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'settings': {'numStates': numStates, 'numGames': numGames,
+                           'minTime': minTime, 'repeat': repeat, 'seed': seed},
+              'layouts': {}}
+    for name in layoutNames:
+        layout = layoutModule.getLayout(name)
+        if layout == None:
+            raise Exception("The layout " + name + " cannot be found")
+        result = benchmarkLayout(layout, numStates, numGames, minTime, repeat, seed)
+        report['layouts'][name] = result
+        print('%-16s %9.0f succ/s %9.0f legal/s  %s' % (
+            name, result['successorsPerSecond'], result['legalActionsPerSecond'],
+            '  '.join(['%s %.2f games/s %.1f kB' % (
+                ghost, result['games'][ghost]['gamesPerSecond'],
+                result['peakMemory'][ghost] / 1024.0) for ghost, _ in GHOST_TYPES])))
+    return report
+
+
+def compareReports(old, new):
+    """
+    Prints new / old for every rate the two reports share; above 1 is faster.
+    """
+    print('Speedup over %s:' % (old['code'].get('revision') or old['time']))
+    for name in sorted(new['layouts']):
+        if name not in old['layouts']:
+            continue
+        before, after = old['layouts'][name], new['layouts'][name]
+        ratios = ['%s %.2fx' % (metric, after[metric] / before[metric])
+                  for metric in RATE_METRICS]
+        for ghost in after['games']:
+            if ghost in before['games']:
+                ratios.append('%s games %.2fx' % (
+                    ghost, after['games'][ghost]['gamesPerSecond'] /
+                    before['games'][ghost]['gamesPerSecond']))
+        print('%-16s %s' % (name, '  '.join(ratios)))
+
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python benchmark.py <options>
+    EXAMPLES:   (1) python benchmark.py -o results.json
+                    - benchmarks every layout in layouts/
+                (2) python benchmark.py -l smallClassic -l mediumClassic --compare old.json
+                    - benchmarks two layouts and compares them with an earlier run
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-l', '--layout', dest='layouts', action='append', default=[],
+                      help='a LAYOUT to benchmark (may be repeated; default: all of layouts/)',
+                      metavar='LAYOUT')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='write the results to FILE as JSON', metavar='FILE')
+    parser.add_option('--compare', dest='compare', default=None,
+                      help='compare the results with an earlier --output FILE', metavar='FILE')
+    parser.add_option('--states', dest='numStates', type='int', default=200,
+                      help='the number of sampled STATES for the successor and legal action benchmarks [Default: %default]',
+                      metavar='STATES')
+    parser.add_option('-n', '--numGames', dest='numGames', type='int', default=3,
+                      help='the number of GAMES played per ghost type and round [Default: %default]',
+                      metavar='GAMES')
+    parser.add_option('--minTime', dest='minTime', type='float', default=0.5,
+                      help='the minimum SECONDS each round of a rate measurement runs [Default: %default]',
+                      metavar='SECONDS')
+    parser.add_option('--repeat', dest='repeat', type='int', default=3,
+                      help='the number of rounds per measurement; the best is kept [Default: %default]')
+    parser.add_option('--seed', dest='seed', type='int', default=0,
+                      help='the random SEED for sampled states and games [Default: %default]',
+                      metavar='SEED')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    report = runBenchmarks(options.layouts, options.numStates, options.numGames,
+                           options.minTime, options.repeat, options.seed)
+    if options.output != None:
+        with open(options.output, 'w') as out:
+            json.dump(report, out, indent=2, sort_keys=True)
+    if options.compare != None:
+        with open(options.compare) as f:
+            compareReports(json.load(f), report)
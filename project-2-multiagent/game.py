@@ -22,9 +22,13 @@
 
 from util import *
 import time
+import math
+import ctypes
 import os
+import random
 import traceback
 import sys
+import threading
 
 #######################
 # Parts worth reading #
@@ -79,12 +83,38 @@ class Configuration:
 
     The convention for positions, like a graph, is that (0,0) is the lower left corner, x increases
     horizontally and y increases vertically.  Therefore, north is the direction of increasing y, or (0,1).
+
+    Configurations are not changed once made, so the ones the game creates
+    are interned (see interned) and shared between states.
     """
+    __slots__ = ('pos', 'direction')
+
+    # Interned configurations by (pos, direction, coordinate type): ghosts
+    # move in float steps, and (3.0, 4) must not stand in for (3, 4).  It is
+    # shared by every game in the process, so it is emptied when it grows
+    # past MAX_INTERNED; configurations only compare by value, so that just
+    # costs some sharing.
+    INTERNED = {}
+    MAX_INTERNED = 1 << 16
 
     def __init__(self, pos, direction):
         self.pos = pos
         self.direction = direction
 
+    def interned(pos, direction):
+        """
+        Returns the shared Configuration for pos and direction.
+        """
+        key = (pos, direction, type(pos[0]), type(pos[1]))
+        configuration = Configuration.INTERNED.get(key)
+        if configuration is None:
+            if len(Configuration.INTERNED) >= Configuration.MAX_INTERNED:
+                Configuration.INTERNED.clear()
+            configuration = Configuration(pos, direction)
+            Configuration.INTERNED[key] = configuration
+        return configuration
+    interned = staticmethod(interned)
+
     def getPosition(self):
         return (self.pos)
 
@@ -96,7 +126,9 @@ class Configuration:
         return x == int(x) and y == int(y)
 
     def __eq__(self, other):
-        if other == None:
+        if self is other:
+            return True
+        if other is None:
             return False
         return (self.pos == other.pos and self.direction == other.direction)
 
@@ -121,13 +153,19 @@ class Configuration:
         direction = Actions.vectorToDirection(vector)
         if direction == Directions.STOP:
             direction = self.direction  # There is no stop direction
-        return Configuration((x + dx, y+dy), direction)
+        return Configuration.interned((x + dx, y+dy), direction)
 
 
 class AgentState:
     """
     AgentStates hold the state of an agent (configuration, speed, scared, etc).
+
+    Successor states share the AgentStates they do not change, so game code
+    replaces an AgentState (see GameStateData.setAgentConfiguration) rather
+    than editing one that a state already holds.
     """
+    __slots__ = ('start', 'configuration', 'isPacman', 'scaredTimer',
+                 'numCarrying', 'numReturned')
 
     def __init__(self, startConfiguration, isPacman):
         self.start = startConfiguration
@@ -145,7 +183,9 @@ class AgentState:
             return "Ghost: " + str(self.configuration)
 
     def __eq__(self, other):
-        if other == None:
+        if self is other:
+            return True
+        if other is None:
             return False
         return self.configuration == other.configuration and self.scaredTimer == other.scaredTimer
 
@@ -153,7 +193,9 @@ class AgentState:
         return hash(hash(self.configuration) + 13 * hash(self.scaredTimer))
 
     def copy(self):
-        state = AgentState(self.start, self.isPacman)
+        state = AgentState.__new__(AgentState)
+        state.start = self.start
+        state.isPacman = self.isPacman
         state.configuration = self.configuration
         state.scaredTimer = self.scaredTimer
         state.numCarrying = self.numCarrying
@@ -169,14 +211,78 @@ class AgentState:
         return self.configuration.getDirection()
 
 
+class GridColumnMethods:
+    """
+    The list behaviour of a GridColumn: a column of a Grid that reads and
+    writes the grid's cells in place.  Reading a cell is done in C, as for
+    any ctypes array; a column compares equal to the list of its values, and
+    takes only booleans.  Columns of read-only Grids cannot be written.
+    """
+    __slots__ = ()
+    _readOnly = False
+
+    def __setitem__(self, key, value):
+        if self._readOnly:
+            raise TypeError('Cannot modify a read-only Grid; copy it first')
+        if isinstance(key, slice):
+            value = [checkGridValue(item) for item in value]
+        else:
+            value = checkGridValue(value)
+        ctypes.Array.__setitem__(self, key, value)
+
+    def __eq__(self, other):
+        try:
+            return len(self) == len(other) and list(self) == list(other)
+        except TypeError:
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def count(self, value):
+        return list(self).count(value)
+
+    def index(self, value):
+        return list(self).index(value)
+
+
+def checkGridValue(value):
+    if value not in [False, True]:
+        raise TypeError('Grids can only contain booleans, not %r' % (value,))
+    return bool(value)
+
+
+# GridColumn types by (height, read-only)
+GRID_COLUMN_TYPES = {}
+
+
+def gridColumnType(height, readOnly):
+    key = (height, readOnly)
+    if key not in GRID_COLUMN_TYPES:
+        GRID_COLUMN_TYPES[key] = type('GridColumn', (GridColumnMethods, ctypes.Array), {
+            '__slots__': (), '_type_': ctypes.c_bool, '_length_': height,
+            '_readOnly': readOnly})
+    return GRID_COLUMN_TYPES[key]
+
+
 class Grid:
     """
-    A 2-dimensional array of objects backed by a list of lists.  Data is accessed
-    via grid[x][y] where (x,y) are positions on a Pacman map with x horizontal,
-    y vertical and the origin (0,0) in the bottom left corner.
+    A 2-dimensional array of booleans backed by a bytearray holding one byte
+    per cell, column by column (cell x * height + y).  Data is accessed via
+    grid[x][y] where (x,y) are positions on a Pacman map with x horizontal,
+    y vertical and the origin (0,0) in the bottom left corner.  grid[x] is a
+    GridColumn, a list-like view of column x (read-only if the grid is a
+    read-only view, see readOnlyView), and grid[a:b] a list of columns.
 
     The __str__ method constructs an output that is oriented like a pacman board.
     """
+    # Set on read-only views, whose columns cannot be written
+    _readOnly = False
 
     def __init__(self, width, height, initialValue=False, bitRepresentation=None):
         if initialValue not in [False, True]:
@@ -185,19 +291,50 @@ class Grid:
 
         self.width = width
         self.height = height
-        self.data = [[initialValue for y in range(
-            height)] for x in range(width)]
+        if initialValue:
+            self.data = bytearray(b'\x01') * (width * height)
+        else:
+            self.data = bytearray(width * height)
+        # Column views, made on first access
+        self._columns = [None] * width
         if bitRepresentation:
             self._unpackBits(bitRepresentation)
 
     def __getitem__(self, i):
-        return self.data[i]
+        if isinstance(i, slice):
+            return [self[x] for x in range(*i.indices(self.width))]
+        column = self._columns[i]
+        if column is None:
+            if i < 0:
+                i += self.width
+            columnType = gridColumnType(self.height, self._readOnly)
+            column = columnType.from_buffer(self.data, i * self.height)
+            self._columns[i] = column
+        return column
 
     def __setitem__(self, key, item):
-        self.data[key] = item
+        if self._readOnly:
+            raise TypeError('Cannot modify a read-only Grid; copy it first')
+        if key < 0:
+            key += self.width
+        if not 0 <= key < self.width:
+            raise IndexError('Grid column out of range')
+        column = bytes([checkGridValue(value) for value in item])
+        if len(column) != self.height:
+            raise ValueError('Grid columns must have %d cells' % self.height)
+        self.data[key * self.height:(key + 1) * self.height] = column
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_columns'] = None  # columns cannot be pickled
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._columns = [None] * self.width
 
     def __str__(self):
-        out = [[str(self.data[x][y])[0] for x in range(self.width)]
+        out = [[str(bool(self.data[x * self.height + y]))[0] for x in range(self.width)]
                for y in range(self.height)]
         out.reverse()
         return '\n'.join([''.join(x) for x in out])
@@ -205,43 +342,79 @@ class Grid:
     def __eq__(self, other):
         if other == None:
             return False
-        return self.data == other.data
+        return self.height == other.height and self.data == other.data
 
     def __hash__(self):
-        # return hash(str(self))
-        base = 1
-        h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
-        return hash(h)
+        return hash(bytes(self.data))
+
+    def _emptyCopy(self):
+        """
+        A Grid of the same shape whose data is still to be filled in; skips
+        building the initial cells that copies would throw away.
+        """
+        g = Grid.__new__(Grid)
+        g.CELLS_PER_INT = self.CELLS_PER_INT
+        g.width = self.width
+        g.height = self.height
+        return g
 
     def copy(self):
-        g = Grid(self.width, self.height)
-        g.data = [x[:] for x in self.data]
+        g = self._emptyCopy()
+        g.data = bytearray(self.data)
+        g._columns = [None] * self.width
         return g
 
     def deepCopy(self):
         return self.copy()
 
     def shallowCopy(self):
-        g = Grid(self.width, self.height)
+        g = self._emptyCopy()
+        g.data = self.data
+        g._columns = self._columns
+        g._readOnly = self._readOnly
+        return g
+
+    def readOnlyView(self):
+        """
+        A Grid sharing this grid's cells that cannot be written through:
+        writing to one of its columns raises TypeError.  copy() of the view
+        is an ordinary, writable Grid.
+        """
+        if self._readOnly:
+            return self.shallowCopy()
+        g = self._emptyCopy()
         g.data = self.data
+        g._columns = [None] * self.width
+        g._readOnly = True
         return g
 
     def count(self, item=True):
-        return sum([x.count(item) for x in self.data])
+        if item:
+            return self.data.count(1)
+        return self.data.count(0)
 
     def asList(self, key=True):
         list = []
-        for x in range(self.width):
-            for y in range(self.height):
-                if self[x][y] == key:
-                    list.append((x, y))
+        data, height = self.data, self.height
+        cell = b'\x01' if key else b'\x00'
+        index = data.find(cell)
+        while index != -1:
+            list.append((index // height, index % height))
+            index = data.find(cell, index + 1)
         return list
 
+    def asArray(self):
+        """
+        A (width, height) NumPy boolean array sharing memory with the grid, so
+        writes through either one show in both.  The array of a read-only
+        view is read-only.
+        """
+        import numpy
+        buffer = self.data
+        if self._readOnly:
+            buffer = memoryview(buffer).toreadonly()
+        return numpy.frombuffer(buffer, dtype=bool).reshape(self.width, self.height)
+
     def packBits(self):
         """
         Returns an efficient int list representation
@@ -252,9 +425,8 @@ class Grid:
         currentInt = 0
         for i in range(self.height * self.width):
             bit = self.CELLS_PER_INT - (i % self.CELLS_PER_INT) - 1
-            x, y = self._cellIndexToPosition(i)
-            if self[x][y]:
-                currentInt += 2 ** bit
+            if self.data[i]:
+                currentInt += 1 << bit
             if (i + 1) % self.CELLS_PER_INT == 0:
                 bits.append(currentInt)
                 currentInt = 0
@@ -262,7 +434,7 @@ class Grid:
         return tuple(bits)
 
     def _cellIndexToPosition(self, index):
-        x = index / self.height
+        x = index // self.height
         y = index % self.height
         return x, y
 
@@ -275,8 +447,7 @@ class Grid:
             for bit in self._unpackInt(packed, self.CELLS_PER_INT):
                 if cell == self.width * self.height:
                     break
-                x, y = self._cellIndexToPosition(cell)
-                self[x][y] = bit
+                self.data[cell] = bit
                 cell += 1
 
     def _unpackInt(self, packed, size):
@@ -393,6 +564,136 @@ class Actions:
     getSuccessor = staticmethod(getSuccessor)
 
 
+class ActionTable:
+    """
+    Precomputed movement information for every cell of a wall grid.
+
+    Cells are numbered x * height + y.  For each cell the table stores the
+    actions Actions.getPossibleActions allows there, the moves left to an
+    agent that may neither stop nor reverse (indexed by its current
+    direction) and the (action, successor) pairs in the north/south/east/west
+    order the search problems use.  The answers only hold for agents
+    standing on a grid point, so positions in between fall back to the
+    Actions computations.
+    """
+    SEARCH_ORDER = [Directions.NORTH, Directions.SOUTH,
+                    Directions.EAST, Directions.WEST]
+
+    def __init__(self, walls):
+        self.width = walls.width
+        self.height = walls.height
+        self.possibleActions = []
+        self.nonReversingActions = []
+        self.moves = []
+        for x in range(self.width):
+            for y in range(self.height):
+                possible = []
+                successors = {}
+                for direction, (dx, dy) in Actions._directionsAsList:
+                    nextX, nextY = x + dx, y + dy
+                    if 0 <= nextX < self.width and 0 <= nextY < self.height and not walls[nextX][nextY]:
+                        possible.append(direction)
+                        successors[direction] = (nextX, nextY)
+                self.possibleActions.append(tuple(possible))
+                self.moves.append(tuple((direction, successors[direction])
+                                        for direction in ActionTable.SEARCH_ORDER if direction in successors))
+                nonReversing = {}
+                for direction in Actions._directions:
+                    actions = [a for a in possible if a != Directions.STOP]
+                    reverse = Actions.reverseDirection(direction)
+                    if reverse in actions and len(actions) > 1:
+                        actions.remove(reverse)
+                    nonReversing[direction] = tuple(actions)
+                self.nonReversingActions.append(nonReversing)
+
+    def _index(self, position):
+        """
+        Returns the cell index of a position on a grid point, or None.
+        """
+        x, y = position
+        x_int, y_int = int(x + 0.5), int(y + 0.5)
+        if abs(x - x_int) + abs(y - y_int) > Actions.TOLERANCE:
+            return None
+        return x_int * self.height + y_int
+
+    def getPossibleActions(self, config):
+        index = self._index(config.pos)
+        if index is None:
+            # In between grid points, all agents must continue straight
+            return [config.getDirection()]
+        return list(self.possibleActions[index])
+
+    def getNonReversingActions(self, config):
+        """
+        The legal moves of an agent that cannot stop, and cannot turn around
+        unless it reaches a dead end.
+        """
+        index = self._index(config.pos)
+        if index is None:
+            actions = [config.getDirection()]
+            if Directions.STOP in actions:
+                actions.remove(Directions.STOP)
+            return actions
+        return list(self.nonReversingActions[index][config.direction])
+
+    def getMoves(self, position):
+        """
+        Returns the (action, nextPosition) pairs for an integer position.
+        """
+        x, y = position
+        return self.moves[x * self.height + y]
+
+
+class ZobristTable:
+    """
+    Random 64-bit keys used to hash board contents incrementally.
+
+    Every cell has one key for food and one for a capsule; the hash of a set
+    of cells is the XOR of their keys, so adding or removing one item updates
+    the hash with a single XOR.  Agents are keyed by hashing their
+    (index, position, direction, scaredTimer) record.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        # A private generator keeps the keys reproducible without touching
+        # the global random state the game itself depends on.
+        rng = random.Random(width * 65536 + height)
+        self.foodKeys = [rng.getrandbits(64) for i in range(width * height)]
+        self.capsuleKeys = [rng.getrandbits(64) for i in range(width * height)]
+
+    def food(self, position):
+        x, y = position
+        return self.foodKeys[x * self.height + y]
+
+    def capsule(self, position):
+        x, y = position
+        return self.capsuleKeys[x * self.height + y]
+
+    def agent(self, agentIndex, agentState):
+        configuration = agentState.configuration
+        if configuration == None:
+            return hash((agentIndex, agentState.scaredTimer))
+        return hash((agentIndex, configuration.pos, configuration.direction, agentState.scaredTimer))
+
+    def hashGrid(self, grid):
+        h = 0
+        for x, y in grid.asList():
+            h ^= self.food((x, y))
+        return h
+
+
+ZOBRIST_TABLE_CACHE = {}
+
+
+def getZobristTable(width, height):
+    key = (width, height)
+    if key not in ZOBRIST_TABLE_CACHE:
+        ZOBRIST_TABLE_CACHE[key] = ZobristTable(width, height)
+    return ZOBRIST_TABLE_CACHE[key]
+
+
 class GameStateData:
 
     def __init__(self, prevState=None):
@@ -402,10 +703,16 @@ class GameStateData:
         if prevState != None:
             self.food = prevState.food.shallowCopy()
             self.capsules = prevState.capsules[:]
-            self.agentStates = self.copyAgentStates(prevState.agentStates)
+            self.agentStates = prevState.agentStates[:]
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+            self._zobrist = prevState._zobrist
+            self.numFood = prevState.numFood
+            self.foodPositions = prevState.foodPositions
+            self._foodHash = prevState._foodHash
+            self._capsuleHash = prevState._capsuleHash
+            self._agentHash = prevState._agentHash
 
         self._foodEaten = None
         self._foodAdded = None
@@ -419,6 +726,24 @@ class GameStateData:
         state = GameStateData(self)
         state.food = self.food.deepCopy()
         state.layout = self.layout.deepCopy()
+        state.agentStates = self.copyAgentStates(self.agentStates)
+        state._agentMoved = self._agentMoved
+        state._foodEaten = self._foodEaten
+        state._foodAdded = self._foodAdded
+        state._capsuleEaten = self._capsuleEaten
+        return state
+
+    def shallowCopy(self):
+        """
+        A copy to hand to agents, which shares the layout with this state and
+        sees its food through a read-only view (see Grid.readOnlyView).  The
+        AgentStates are copied, so nothing an agent does to the copy changes
+        this state.  The rules replace the food grid rather than editing it
+        (see removeFood), so successors of the copy get grids of their own.
+        """
+        state = GameStateData(self)
+        state.food = self.food.readOnlyView()
+        state.agentStates = self.copyAgentStates(self.agentStates)
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
         state._foodAdded = self._foodAdded
@@ -431,6 +756,66 @@ class GameStateData:
             copiedStates.append(agentState.copy())
         return copiedStates
 
+    def rehash(self):
+        """
+        Recomputes the incremental hash and the food index from scratch.
+        Needed only after building or editing a GameStateData by hand; the
+        game rules keep both up to date themselves.
+        """
+        foodList = self.food.asList()
+        self.numFood = len(foodList)
+        self.foodPositions = dict.fromkeys(foodList)
+        self._zobrist = getZobristTable(self.layout.width, self.layout.height)
+        self._foodHash = self._zobrist.hashGrid(self.food)
+        self._capsuleHash = 0
+        for position in self.capsules:
+            self._capsuleHash ^= self._zobrist.capsule(position)
+        self._agentHash = 0
+        for agentIndex, agentState in enumerate(self.agentStates):
+            self._agentHash ^= self._zobrist.agent(agentIndex, agentState)
+
+    def setAgentConfiguration(self, agentIndex, configuration):
+        """
+        Moves an agent, replacing its (possibly shared) AgentState.
+        """
+        agentState = self.agentStates[agentIndex]
+        self._agentHash ^= self._zobrist.agent(agentIndex, agentState)
+        agentState = agentState.copy()
+        agentState.configuration = configuration
+        self.agentStates[agentIndex] = agentState
+        self._agentHash ^= self._zobrist.agent(agentIndex, agentState)
+
+    def setScaredTimer(self, agentIndex, scaredTimer):
+        """
+        Sets an agent's scared timer, replacing its (possibly shared) AgentState.
+        """
+        agentState = self.agentStates[agentIndex]
+        if agentState.scaredTimer == scaredTimer:
+            return
+        self._agentHash ^= self._zobrist.agent(agentIndex, agentState)
+        agentState = agentState.copy()
+        agentState.scaredTimer = scaredTimer
+        self.agentStates[agentIndex] = agentState
+        self._agentHash ^= self._zobrist.agent(agentIndex, agentState)
+
+    def removeFood(self, position):
+        """
+        Clears the food at position, copying the (shared) food grid first.
+        """
+        x, y = position
+        self.food = self.food.copy()
+        self.food.data[x * self.food.height + y] = 0
+        self._foodHash ^= self._zobrist.food(position)
+        self.numFood -= 1
+        # foodPositions is shared with the predecessor, so replace it
+        foodPositions = self.foodPositions.copy()
+        del foodPositions[position]
+        self.foodPositions = foodPositions
+
+    def removeCapsule(self, position):
+        self.capsules.remove(position)
+        self._capsuleHash ^= self._zobrist.capsule(position)
+
     def __eq__(self, other):
         """
         Allows two states to be compared.
@@ -438,6 +823,9 @@ class GameStateData:
         if other == None:
             return False
         # TODO Check for type of other
+        # The stored hash is a cheap filter for the common unequal case
+        if hash(self) != hash(other):
+            return False
         if not self.agentStates == other.agentStates:
             return False
         if not self.food == other.food:
@@ -452,17 +840,11 @@ class GameStateData:
         """
         Allows states to be keys of dictionaries.
         """
-        for i, state in enumerate(self.agentStates):
-            try:
-                int(hash(state))
-            except TypeError as e:
-                print(e)
-                # hash(state)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113 * hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575)
+        return self._foodHash ^ self._capsuleHash ^ self._agentHash ^ hash(self.score)
 
     def __str__(self):
         width, height = self.layout.width, self.layout.height
-        map = Grid(width, height)
+        map = [[' ' for y in range(height)] for x in range(width)]
         if type(self.food) == type((1, 2)):
             self.food = reconstituteGrid(self.food)
         for x in range(width):
@@ -485,7 +867,9 @@ class GameStateData:
         for x, y in self.capsules:
             map[x][y] = 'o'
 
-        return str(map) + ("\nScore: %d\n" % self.score)
+        rows = [''.join([map[x][y] for x in range(width)])
+                for y in range(height - 1, -1, -1)]
+        return '\n'.join(rows) + ("\nScore: %d\n" % self.score)
 
     def _foodWallStr(self, hasFood, hasWall):
         if hasFood:
@@ -536,6 +920,319 @@ class GameStateData:
             self.agentStates.append(AgentState(
                 Configuration(pos, Directions.STOP), isPacman))
         self._eaten = [False for a in self.agentStates]
+        self.rehash()
+
+
+class BitboardStateData:
+    """
+    A compact alternative to GameStateData.
+
+    Food is stored as an integer bitmask over the cells of the layout (bit
+    x * height + y), capsules as a bitmask over the entries of
+    layout.capsules, and agents as one flat tuple holding an
+    (x, y, direction, scaredTimer) record per agent.  Everything that never
+    changes during a game (the layout, agent start positions, the capsule
+    index) lives in a BitboardStatics object shared by every state, so a
+    successor costs a handful of integer operations instead of list copies.
+    """
+    __slots__ = ('statics', 'food', 'capsules', 'agents', 'numFood', 'score',
+                 '_win', '_lose', '_foodGrid')
+
+    AGENT_FIELDS = 4
+
+    def __init__(self, statics, food, capsules, agents, numFood, score, win=False, lose=False):
+        self.statics = statics
+        self.food = food
+        self.capsules = capsules
+        self.agents = agents
+        self.numFood = numFood
+        self.score = score
+        self._win = win
+        self._lose = lose
+        self._foodGrid = None
+
+    def getLayout(self):
+        return self.statics.layout
+
+    def getNumAgents(self):
+        return len(self.agents) // BitboardStateData.AGENT_FIELDS
+
+    def getAgent(self, agentIndex):
+        """
+        Returns the (x, y, direction, scaredTimer) record of an agent.
+        """
+        start = agentIndex * BitboardStateData.AGENT_FIELDS
+        return self.agents[start:start + BitboardStateData.AGENT_FIELDS]
+
+    def hasFood(self, x, y):
+        return (self.food >> (x * self.statics.height + y)) & 1 == 1
+
+    def getFoodPositions(self):
+        """
+        Lists the food positions in Grid.asList order (ascending bit index).
+        """
+        height = self.statics.height
+        positions = []
+        food = self.food
+        while food:
+            low = food & -food
+            index = low.bit_length() - 1
+            positions.append((index // height, index % height))
+            food ^= low
+        return positions
+
+    def getFoodGrid(self):
+        """
+        Builds (once per state) a Grid view of the food bitmask.
+        """
+        if self._foodGrid is None:
+            grid = Grid(self.statics.layout.width, self.statics.height)
+            for x, y in self.getFoodPositions():
+                grid[x][y] = True
+            self._foodGrid = grid
+        return self._foodGrid
+
+    def getCapsules(self):
+        positions = self.statics.capsulePositions
+        return [positions[i] for i in range(len(positions)) if (self.capsules >> i) & 1]
+
+    def __eq__(self, other):
+        if not isinstance(other, BitboardStateData):
+            return False
+        return (self.agents == other.agents and self.food == other.food and
+                self.capsules == other.capsules and self.score == other.score)
+
+    def __hash__(self):
+        return hash((self.agents, self.food, self.capsules, self.score))
+
+    def toGameStateData(self):
+        """
+        Expands this state into a regular GameStateData.
+        """
+        statics = self.statics
+        data = GameStateData()
+        data.layout = statics.layout
+        data.food = self.getFoodGrid().copy()
+        data.capsules = self.getCapsules()
+        data.score = self.score
+        data.agentStates = []
+        for agentIndex in range(self.getNumAgents()):
+            x, y, direction, scaredTimer = self.getAgent(agentIndex)
+            agentState = AgentState(Configuration(
+                statics.starts[agentIndex], Directions.STOP), statics.isPacman[agentIndex])
+            agentState.configuration = Configuration((x, y), direction)
+            agentState.scaredTimer = scaredTimer
+            data.agentStates.append(agentState)
+        data._eaten = [False for a in data.agentStates]
+        data._win = self._win
+        data._lose = self._lose
+        data.rehash()
+        return data
+
+    def fromGameStateData(data):
+        """
+        Packs a regular GameStateData into its bitboard form.
+        """
+        layout = data.layout
+        statics = BitboardStatics(layout, [s.start.getPosition() for s in data.agentStates],
+                                  [s.isPacman for s in data.agentStates])
+        height = layout.height
+        food = 0
+        numFood = 0
+        for x, y in data.food.asList():
+            food |= 1 << (x * height + y)
+            numFood += 1
+        capsules = 0
+        for position in data.capsules:
+            capsules |= 1 << statics.capsuleBits[position]
+        agents = []
+        for agentState in data.agentStates:
+            x, y = agentState.configuration.getPosition()
+            agents.extend((x, y, agentState.configuration.getDirection(),
+                           agentState.scaredTimer))
+        return BitboardStateData(statics, food, capsules, tuple(agents), numFood,
+                                 data.score, data._win, data._lose)
+    fromGameStateData = staticmethod(fromGameStateData)
+
+
+class BitboardStatics:
+    """
+    The parts of a bitboard game that never change between states.
+    """
+    __slots__ = ('layout', 'height', 'starts', 'isPacman',
+                 'capsulePositions', 'capsuleBits')
+
+    def __init__(self, layout, starts, isPacman):
+        self.layout = layout
+        self.height = layout.height
+        self.starts = tuple(starts)
+        self.isPacman = tuple(isPacman)
+        self.capsulePositions = tuple(layout.capsules)
+        self.capsuleBits = dict((position, i)
+                                for i, position in enumerate(self.capsulePositions))
+
+
+def percentile(sortedValues, fraction):
+    """
+    The nearest-rank percentile of an already sorted list (None if empty).
+    """
+    if not sortedValues:
+        return None
+    rank = int(math.ceil(fraction * len(sortedValues)))
+    return sortedValues[min(len(sortedValues), max(1, rank)) - 1]
+
+
+class MoveInstrumentation:
+    """
+    Records, for each agent and move of one game, the getAction wall time and
+    the number of generateSuccessor and evaluation function calls made while
+    choosing the move.
+
+    A Game consults its instrumentation only when it is given one, by wrapping
+    its agents at the start of the game (see InstrumentedAgent), so games
+    without instrumentation run exactly as before.  The state classes report
+    successors through countSuccessor, which they call only while some
+    instrumented move is in progress.  Counts are kept per thread, so games
+    played at the same time in different threads do not count each other's
+    calls.
+    """
+    # The number of instrumented moves being chosen right now, in any thread
+    active = 0
+    _activeLock = threading.Lock()
+    # The [successors, evaluations] counts of the move in progress on each
+    # thread
+    _counters = threading.local()
+
+    RECORD_FIELDS = ['agent', 'moves', 'p50', 'p95', 'p99', 'max', 'mean',
+                     'totalTime', 'successors', 'evaluations', 'moveTimeout']
+
+    def __init__(self):
+        # One (agentIndex, seconds, successors, evaluations) tuple per move
+        self.moves = []
+
+    def instrument(self, agents):
+        return [InstrumentedAgent(agent, index, self) if agent else agent
+                for index, agent in enumerate(agents)]
+
+    def recordMove(self, agentIndex, seconds, successors, evaluations):
+        self.moves.append((agentIndex, seconds, successors, evaluations))
+
+    def beginMove():
+        """
+        Starts counting calls on this thread; returns the counts, and the ones
+        of an enclosing move to hand back to endMove.
+        """
+        with MoveInstrumentation._activeLock:
+            MoveInstrumentation.active += 1
+        enclosing = getattr(MoveInstrumentation._counters, 'counts', None)
+        counts = [0, 0]
+        MoveInstrumentation._counters.counts = counts
+        return counts, enclosing
+    beginMove = staticmethod(beginMove)
+
+    def endMove(enclosing):
+        MoveInstrumentation._counters.counts = enclosing
+        with MoveInstrumentation._activeLock:
+            MoveInstrumentation.active -= 1
+    endMove = staticmethod(endMove)
+
+    def countSuccessor():
+        counts = getattr(MoveInstrumentation._counters, 'counts', None)
+        if counts != None:
+            counts[0] += 1
+    countSuccessor = staticmethod(countSuccessor)
+
+    def countEvaluation():
+        counts = getattr(MoveInstrumentation._counters, 'counts', None)
+        if counts != None:
+            counts[1] += 1
+    countEvaluation = staticmethod(countEvaluation)
+
+    def summarize(self, numAgents, rules=None):
+        """
+        One record per agent: the p50/p95/p99/max/mean getAction latency, the
+        total time and call counts, and the rules' move timeout if known.
+        """
+        records = []
+        for agentIndex in range(numAgents):
+            moves = [move for move in self.moves if move[0] == agentIndex]
+            latencies = sorted([move[1] for move in moves])
+            total = sum(latencies)
+            records.append({
+                'agent': agentIndex,
+                'moves': len(moves),
+                'p50': percentile(latencies, 0.50),
+                'p95': percentile(latencies, 0.95),
+                'p99': percentile(latencies, 0.99),
+                'max': latencies[-1] if latencies else None,
+                'mean': total / len(latencies) if latencies else None,
+                'totalTime': total,
+                'successors': sum([move[2] for move in moves]),
+                'evaluations': sum([move[3] for move in moves]),
+                'moveTimeout': rules.getMoveTimeout(agentIndex) if rules != None else None})
+        return records
+
+
+class InstrumentedAgent:
+    """
+    Stands in for an agent during an instrumented game.  Everything but
+    getAction is passed through to the wrapped agent.
+
+    While an instrumented move runs, an evaluationFunction of the agent is
+    replaced by a wrapper that reports its calls to
+    MoveInstrumentation.countEvaluation; the agent gets its own back when the
+    move ends, so it is left as it was found.
+    """
+
+    def __init__(self, agent, index, instrumentation):
+        self.agent = agent
+        self.agentIndex = index
+        self.instrumentation = instrumentation
+
+    def __getattr__(self, name):
+        return getattr(self.agent, name)
+
+    def __dir__(self):
+        return dir(self.agent)
+
+    def countEvaluations(self):
+        """
+        Wraps the agent's evaluationFunction and returns the function that
+        puts the original back (which does nothing if nothing was wrapped).
+        """
+        attributes = getattr(self.agent, '__dict__', None)
+        evaluationFunction = getattr(self.agent, 'evaluationFunction', None)
+        if attributes is None or evaluationFunction is None or \
+                getattr(evaluationFunction, 'countsEvaluations', False):
+            return lambda: None
+
+        def countedEvaluation(*args):
+            MoveInstrumentation.countEvaluation()
+            return evaluationFunction(*args)
+        countedEvaluation.countsEvaluations = True
+        hadOwn = 'evaluationFunction' in attributes
+        attributes['evaluationFunction'] = countedEvaluation
+
+        def restore():
+            if hadOwn:
+                attributes['evaluationFunction'] = evaluationFunction
+            else:
+                del attributes['evaluationFunction']
+        return restore
+
+    def getAction(self, state):
+        counts, enclosing = MoveInstrumentation.beginMove()
+        restore = self.countEvaluations()
+        start = time.time()
+        try:
+            action = self.agent.getAction(state)
+        finally:
+            elapsed = time.time() - start
+            restore()
+            MoveInstrumentation.endMove(enclosing)
+        self.instrumentation.recordMove(
+            self.agentIndex, elapsed, counts[0], counts[1])
+        return action
 
 
 try:
@@ -550,8 +1247,18 @@ class Game:
     The Game manages the control flow, soliciting actions from agents.
     """
 
-    def __init__(self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False):
+    def __init__(self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False, trusted=False, instrumentation=None):
+        """
+        A trusted game runs its agents directly: no exception handling,
+        timeouts, output muting or move timing (see runTrusted).  An optional
+        MoveInstrumentation records per-move latencies and call counts.
+        """
+        if trusted and (catchExceptions or muteAgents):
+            raise Exception('Trusted games neither catch exceptions nor mute agents')
         self.agentCrashed = False
+        self.instrumentation = instrumentation
+        if instrumentation != None:
+            agents = instrumentation.instrument(agents)
         self.agents = agents
         self.display = display
         self.rules = rules
@@ -559,6 +1266,9 @@ class Game:
         self.gameOver = False
         self.muteAgents = muteAgents
         self.catchExceptions = catchExceptions
+        self.trusted = trusted
+        # Optional replay.ReplayWriter receiving every move as it is made
+        self.recorder = None
         self.moveHistory = []
         self.totalAgentTimes = [0 for agent in agents]
         self.totalAgentTimeWarnings = [0 for agent in agents]
@@ -580,31 +1290,25 @@ class Game:
         self.agentCrashed = True
         self.rules.agentCrash(self, agentIndex)
 
-    OLD_STDOUT = None
-    OLD_STDERR = None
-
+    # Agents print to their own output through a redirection local to the
+    # thread playing the game, so concurrent games do not swap each
+    # other's streams
     def mute(self, agentIndex):
         if not self.muteAgents:
             return
-        global OLD_STDOUT, OLD_STDERR
-        import io
-        OLD_STDOUT = sys.stdout
-        OLD_STDERR = sys.stderr
-        sys.stdout = self.agentOutput[agentIndex]
-        sys.stderr = self.agentOutput[agentIndex]
+        redirectOutput(self.agentOutput[agentIndex])
 
     def unmute(self):
         if not self.muteAgents:
             return
-        global OLD_STDOUT, OLD_STDERR
-        # Revert stdout/stderr to originals
-        sys.stdout = OLD_STDOUT
-        sys.stderr = OLD_STDERR
+        redirectOutput(None)
 
     def run(self):
         """
         Main control loop for game play.
         """
+        if self.trusted:
+            return self.runTrusted()
         self.display.initialize(self.state.data)
         self.numMoves = 0
 
@@ -664,7 +1368,7 @@ class Game:
                             self.rules.getMoveTimeout(agentIndex)))
                         try:
                             start_time = time.time()
-                            observation = timed_func(self.state.deepCopy())
+                            observation = timed_func(self.state.shallowCopy())
                         except TimeoutFunctionException:
                             skip_action = True
                         move_time += time.time() - start_time
@@ -675,10 +1379,10 @@ class Game:
                         return
                 else:
                     observation = agent.observationFunction(
-                        self.state.deepCopy())
+                        self.state.shallowCopy())
                 self.unmute()
             else:
-                observation = self.state.deepCopy()
+                observation = self.state.shallowCopy()
 
             # Solicit an action
             action = None
@@ -729,7 +1433,9 @@ class Game:
                     self.unmute()
                     return
             else:
+                start_time = time.time()
                 action = agent.getAction(observation)
+                self.totalAgentTimes[agentIndex] += time.time() - start_time
             self.unmute()
 
             # Execute the action
@@ -745,6 +1451,8 @@ class Game:
                     return
             else:
                 self.state = self.state.generateSuccessor(agentIndex, action)
+            if self.recorder != None:
+                self.recorder.recordMove(agentIndex, action, self.state)
 
             # Change the display
             self.display.update(self.state.data)
@@ -776,3 +1484,48 @@ class Game:
                     self.unmute()
                     return
         self.display.finish()
+
+    def runTrusted(self):
+        """
+        The control loop for agents that are our own code, e.g. in large
+        offline evaluations.  Agent capabilities are looked up once, and each
+        move only observes, asks for an action, generates the successor and
+        processes the rules.  Agent errors propagate to the caller and
+        totalAgentTimes is not kept.
+        """
+        self.display.initialize(self.state.data)
+        self.numMoves = 0
+
+        for i, agent in enumerate(self.agents):
+            if not agent:
+                print("Agent %d failed to load" % i, file=sys.stderr)
+                self._agentCrash(i, quiet=True)
+                return
+            if hasattr(agent, 'registerInitialState'):
+                agent.registerInitialState(self.state.deepCopy())
+
+        observers = [getattr(agent, 'observationFunction', None)
+                     for agent in self.agents]
+        actors = [agent.getAction for agent in self.agents]
+        display, rules, recorder = self.display, self.rules, self.recorder
+        moveHistory = self.moveHistory
+        agentIndex = self.startingIndex
+        numAgents = len(self.agents)
+
+        while not self.gameOver:
+            observation = self.state.shallowCopy()
+            if observers[agentIndex] != None:
+                observation = observers[agentIndex](observation)
+            action = actors[agentIndex](observation)
+            moveHistory.append((agentIndex, action))
+            self.state = self.state.generateSuccessor(agentIndex, action)
+            if recorder != None:
+                recorder.recordMove(agentIndex, action, self.state)
+            display.update(self.state.data)
+            rules.process(self.state, self)
+            agentIndex = (agentIndex + 1) % numAgents
+
+        for agent in self.agents:
+            if hasattr(agent, 'final'):
+                agent.final(self.state)
+        display.finish()
@@ -71,7 +71,7 @@ class ReflexAgent(Agent):
         successorGameState = currentGameState.generatePacmanSuccessor(action)
         newPos = successorGameState.getPacmanPosition()
         newFood = successorGameState.getFood()
-        newFoodList = newFood.asList()
+        newFoodList = successorGameState.getFoodPositions()
         newGhostStates = successorGameState.getGhostStates()
         newScaredTimes = [ghostState.scaredTimer for ghostState in newGhostStates]
 
@@ -372,8 +372,7 @@ def betterEvaluationFunction(currentGameState: GameState):
     
     # Get game state information
     pacmanPos = currentGameState.getPacmanPosition()
-    food = currentGameState.getFood()
-    foodList = food.asList()
+    foodList = currentGameState.getFoodPositions()
     ghostStates = currentGameState.getGhostStates()
     scaredTimes = [ghostState.scaredTimer for ghostState in ghostStates]
     capsules = currentGameState.getCapsules()
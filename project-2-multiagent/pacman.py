@@ -43,6 +43,10 @@ from game import GameStateData
 from game import Game
 from game import Directions
 from game import Actions
+from game import AgentState
+from game import Configuration
+from game import BitboardStateData
+from game import MoveInstrumentation
 from util import nearestPoint
 from util import manhattanDistance
 import util
@@ -52,6 +56,7 @@ import types
 import time
 import random
 import os
+import heapq
 
 ###################################################
 # YOUR INTERFACE TO THE PACMAN WORLD: A GameState #
@@ -77,15 +82,111 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
+    # static variables keep track of the states generateSuccessor has seen.
+    # What is recorded depends on the tracking mode (see setExploredTracking):
+    #   'full'   - every state goes into the explored set (used for grading)
+    #   'sample' - a fixed-size uniform sample of the distinct states is kept
+    #   'count'  - only the number of states is counted
+    #   'off'    - nothing is recorded
+    EXPLORED_TRACKING_MODES = ('off', 'count', 'sample', 'full')
+    exploredTracking = 'full'
     explored = set()
+    exploredCount = 0
+    exploredSampleSize = 1000
+    # The sampled states by sample key, and a max-heap of their negated keys
+    exploredSample = {}
+    _exploredSampleKeys = []
+    # When enabled, a util.LRUCache of successors keyed by (state,
+    # agentIndex, action, action table); see enableSuccessorCache
+    successorCache = None
 
     def getAndResetExplored():
-        tmp = GameState.explored.copy()
+        if GameState.exploredTracking == 'sample':
+            tmp = set(GameState.exploredSample.values())
+        else:
+            tmp = GameState.explored.copy()
         GameState.explored = set()
+        GameState.exploredSample = {}
+        GameState._exploredSampleKeys = []
+        GameState.exploredCount = 0
         return tmp
     getAndResetExplored = staticmethod(getAndResetExplored)
 
+    def getAndResetExploredCount():
+        """
+        Returns how many states were recorded (with repetitions) since the last
+        reset.  Available in every tracking mode except 'off'.
+        """
+        tmp = GameState.exploredCount
+        GameState.getAndResetExplored()
+        return tmp
+    getAndResetExploredCount = staticmethod(getAndResetExploredCount)
+
+    def setExploredTracking(mode, sampleSize=1000):
+        if mode not in GameState.EXPLORED_TRACKING_MODES:
+            raise Exception('Unknown explored tracking mode: ' + str(mode))
+        GameState.exploredTracking = mode
+        GameState.exploredSampleSize = sampleSize
+        GameState.getAndResetExplored()
+    setExploredTracking = staticmethod(setExploredTracking)
+
+    def _recordExplored(state):
+        GameState.exploredCount += 1
+        mode = GameState.exploredTracking
+        if mode == 'full':
+            GameState.explored.add(state)
+        elif mode == 'sample':
+            # A bottom-k sample: every state gets a pseudo-random key from its
+            # hash and the states with the smallest keys are kept.  A state
+            # recorded again gets the same key, so each distinct state has the
+            # same chance of being sampled however often it is generated
+            key = GameState._sampleKey(state)
+            sample = GameState.exploredSample
+            if key in sample:
+                return
+            keys = GameState._exploredSampleKeys
+            if len(sample) < GameState.exploredSampleSize:
+                sample[key] = state
+                heapq.heappush(keys, -key)
+            elif keys and key < -keys[0]:
+                del sample[-heapq.heapreplace(keys, -key)]
+                sample[key] = state
+    _recordExplored = staticmethod(_recordExplored)
+
+    def _sampleKey(state):
+        # Scrambles the hash so that similar states get unrelated keys
+        key = (hash(state) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        return key ^ (key >> 29)
+    _sampleKey = staticmethod(_sampleKey)
+
+    def enableSuccessorCache(maxSize=100000):
+        """
+        Makes generateSuccessor remember the last maxSize successors it built.
+        Asking again for the successor of an equal state under the same move
+        then returns the state built the first time, which is safe because
+        states are not changed once generated.  State equality ignores the
+        walls, so the key also holds the layout's ActionTable, which layouts
+        with the same walls share.
+        """
+        GameState.successorCache = util.LRUCache(maxSize)
+    enableSuccessorCache = staticmethod(enableSuccessorCache)
+
+    def disableSuccessorCache():
+        GameState.successorCache = None
+    disableSuccessorCache = staticmethod(disableSuccessorCache)
+
+    def getSuccessorCacheStats():
+        """
+        The hits, misses, size and maxSize of the successor cache, or None if
+        it is disabled.
+        """
+        cache = GameState.successorCache
+        if cache is None:
+            return None
+        return {'hits': cache.hits, 'misses': cache.misses,
+                'size': len(cache), 'maxSize': cache.maxSize}
+    getSuccessorCacheStats = staticmethod(getSuccessorCacheStats)
+
     def getLegalActions(self, agentIndex=0):
         """
         Returns the legal actions for the agent specified.
@@ -107,6 +208,24 @@ class GameState:
         if self.isWin() or self.isLose():
             raise Exception('Can\'t generate a successor of a terminal state.')
 
+        cache = GameState.successorCache
+        if cache is None:
+            state = self._buildSuccessor(agentIndex, action)
+        else:
+            key = (self, agentIndex, action, self.data.layout.getActionTable())
+            state = cache.get(key)
+            if state is None:
+                state = self._buildSuccessor(agentIndex, action)
+                cache.put(key, state)
+
+        if MoveInstrumentation.active:
+            MoveInstrumentation.countSuccessor()
+        if GameState.exploredTracking != 'off':
+            GameState._recordExplored(self)
+            GameState._recordExplored(state)
+        return state
+
+    def _buildSuccessor(self, agentIndex, action):
         # Copy current state
         state = GameState(self)
 
@@ -121,7 +240,7 @@ class GameState:
         if agentIndex == 0:
             state.data.scoreChange += -TIME_PENALTY  # Penalty for waiting around
         else:
-            GhostRules.decrementTimer(state.data.agentStates[agentIndex])
+            GhostRules.decrementTimer(state, agentIndex)
 
         # Resolve multi-agent effects
         GhostRules.checkDeath(state, agentIndex)
@@ -129,8 +248,6 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
         return state
 
     def getLegalPacmanActions(self):
@@ -183,7 +300,14 @@ class GameState:
         return self.data.capsules
 
     def getNumFood(self):
-        return self.data.food.count()
+        return self.data.numFood
+
+    def getFoodPositions(self):
+        """
+        Returns a list of positions (x,y) of the remaining food, in the same
+        order as getFood().asList(), without scanning the grid.
+        """
+        return list(self.data.foodPositions)
 
     def getFood(self):
         """
@@ -240,6 +364,17 @@ class GameState:
         state.data = self.data.deepCopy()
         return state
 
+    def shallowCopy(self):
+        """
+        A copy of the state for agents to observe.  It shares the layout, walls
+        and food with this state instead of rebuilding them; the food grid it
+        returns from getFood is read-only (copy it to edit), and its agent
+        states are its own.
+        """
+        state = GameState()
+        state.data = self.data.shallowCopy()
+        return state
+
     def __eq__(self, other):
         """
         Allows two states to be compared.
@@ -262,6 +397,212 @@ class GameState:
         """
         self.data.initialize(layout, numGhostAgents)
 
+    def toCompact(self):
+        """
+        Returns a CompactGameState holding the same game position.
+        """
+        return CompactGameState.fromGameState(self)
+
+
+class CompactGameState:
+    """
+    A drop-in alternative to GameState for deep adversarial search.
+
+    The state is held in a game.BitboardStateData: food and capsules are
+    integer bitmasks and the agents a flat tuple of (x, y, direction,
+    scaredTimer) records, so generateSuccessor copies nothing but a few
+    integers and one short tuple.  It follows the classic rules exactly and
+    offers the same accessors as GameState; getFood() and the agent state
+    accessors build their Grid/AgentState views on demand.
+
+    Convert with GameState.toCompact() and CompactGameState.toGameState().
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def fromGameState(state):
+        return CompactGameState(BitboardStateData.fromGameStateData(state.data))
+    fromGameState = staticmethod(fromGameState)
+
+    def toGameState(self):
+        state = GameState()
+        state.data = self.data.toGameStateData()
+        return state
+
+    def getLegalActions(self, agentIndex=0):
+        """
+        Returns the legal actions for the agent specified.
+        """
+        if self.isWin() or self.isLose():
+            return []
+        x, y, direction, scaredTimer = self.data.getAgent(agentIndex)
+        table = self.data.getLayout().getActionTable()
+        if agentIndex == 0:
+            return table.getPossibleActions(Configuration((x, y), direction))
+        # Same restrictions as GhostRules.getLegalActions
+        return table.getNonReversingActions(Configuration((x, y), direction))
+
+    def getLegalPacmanActions(self):
+        return self.getLegalActions(0)
+
+    def generateSuccessor(self, agentIndex, action):
+        """
+        Returns the successor state after the specified agent takes the action.
+        """
+        if self.isWin() or self.isLose():
+            raise Exception('Can\'t generate a successor of a terminal state.')
+        if MoveInstrumentation.active:
+            MoveInstrumentation.countSuccessor()
+        if action not in self.getLegalActions(agentIndex):
+            if agentIndex == 0:
+                raise Exception("Illegal action " + str(action))
+            raise Exception("Illegal ghost action " + str(action))
+
+        data = self.data
+        statics = data.statics
+        fields = BitboardStateData.AGENT_FIELDS
+        agents = list(data.agents)
+        food, capsules, numFood = data.food, data.capsules, data.numFood
+        win, lose = data._win, data._lose
+        scoreChange = 0
+
+        base = agentIndex * fields
+        x, y, direction, scaredTimer = agents[base:base + fields]
+        if agentIndex == 0:
+            dx, dy = Actions.directionToVector(action, PacmanRules.PACMAN_SPEED)
+        else:
+            speed = GhostRules.GHOST_SPEED
+            if scaredTimer > 0:
+                speed /= 2.0
+            dx, dy = Actions.directionToVector(action, speed)
+        if action != Directions.STOP:
+            direction = action
+        x, y = x + dx, y + dy
+
+        if agentIndex == 0:
+            # Eat
+            nearest = nearestPoint((x, y))
+            if manhattanDistance(nearest, (x, y)) <= 0.5:
+                bit = 1 << (nearest[0] * statics.height + nearest[1])
+                if food & bit:
+                    scoreChange += 10
+                    food ^= bit
+                    numFood -= 1
+                    if numFood == 0 and not lose:
+                        scoreChange += 500
+                        win = True
+                capsule = statics.capsuleBits.get(nearest)
+                if capsule is not None and (capsules >> capsule) & 1:
+                    capsules ^= 1 << capsule
+                    for ghost in range(1, len(agents) // fields):
+                        agents[ghost * fields + 3] = SCARED_TIME
+            agents[base:base + 3] = x, y, direction
+            scoreChange -= TIME_PENALTY
+        else:
+            # Time passes for the ghost that moved
+            if scaredTimer == 1:
+                x, y = nearestPoint((x, y))
+            agents[base:base + fields] = x, y, direction, max(0, scaredTimer - 1)
+
+        # Resolve collisions (GhostRules.checkDeath)
+        if agentIndex == 0:
+            ghosts = range(1, len(agents) // fields)
+        else:
+            ghosts = [agentIndex]
+        pacmanPosition = (agents[0], agents[1])
+        for ghost in ghosts:
+            ghostBase = ghost * fields
+            ghostPosition = (agents[ghostBase], agents[ghostBase + 1])
+            if GhostRules.canKill(pacmanPosition, ghostPosition):
+                if agents[ghostBase + 3] > 0:
+                    scoreChange += 200
+                    startX, startY = statics.starts[ghost]
+                    agents[ghostBase:ghostBase + fields] = startX, startY, Directions.STOP, 0
+                elif not win:
+                    scoreChange -= 500
+                    lose = True
+
+        return CompactGameState(BitboardStateData(statics, food, capsules, tuple(agents),
+                                                  numFood, data.score + scoreChange, win, lose))
+
+    def generatePacmanSuccessor(self, action):
+        return self.generateSuccessor(0, action)
+
+    def getPacmanState(self):
+        return self._agentState(0)
+
+    def getPacmanPosition(self):
+        return (self.data.agents[0], self.data.agents[1])
+
+    def getGhostStates(self):
+        return [self._agentState(i) for i in range(1, self.getNumAgents())]
+
+    def getGhostState(self, agentIndex):
+        if agentIndex == 0 or agentIndex >= self.getNumAgents():
+            raise Exception("Invalid index passed to getGhostState")
+        return self._agentState(agentIndex)
+
+    def getGhostPosition(self, agentIndex):
+        if agentIndex == 0:
+            raise Exception("Pacman's index passed to getGhostPosition")
+        base = agentIndex * BitboardStateData.AGENT_FIELDS
+        return (self.data.agents[base], self.data.agents[base + 1])
+
+    def getGhostPositions(self):
+        return [self.getGhostPosition(i) for i in range(1, self.getNumAgents())]
+
+    def getNumAgents(self):
+        return self.data.getNumAgents()
+
+    def getScore(self):
+        return float(self.data.score)
+
+    def getCapsules(self):
+        return self.data.getCapsules()
+
+    def getNumFood(self):
+        return self.data.numFood
+
+    def getFoodPositions(self):
+        return self.data.getFoodPositions()
+
+    def getFood(self):
+        return self.data.getFoodGrid()
+
+    def getWalls(self):
+        return self.data.getLayout().walls
+
+    def hasFood(self, x, y):
+        return self.data.hasFood(x, y)
+
+    def hasWall(self, x, y):
+        return self.data.getLayout().walls[x][y]
+
+    def isLose(self):
+        return self.data._lose
+
+    def isWin(self):
+        return self.data._win
+
+    def _agentState(self, agentIndex):
+        statics = self.data.statics
+        x, y, direction, scaredTimer = self.data.getAgent(agentIndex)
+        agentState = AgentState(Configuration(
+            statics.starts[agentIndex], Directions.STOP), statics.isPacman[agentIndex])
+        agentState.configuration = Configuration((x, y), direction)
+        agentState.scaredTimer = scaredTimer
+        return agentState
+
+    def __eq__(self, other):
+        return isinstance(other, CompactGameState) and self.data == other.data
+
+    def __hash__(self):
+        return hash(self.data)
+
+    def __str__(self):
+        return str(self.toGameState())
+
 ############################################################################
 #                     THE HIDDEN SECRETS OF PACMAN                         #
 #                                                                          #
@@ -283,11 +624,13 @@ class ClassicGameRules:
     def __init__(self, timeout=30):
         self.timeout = timeout
 
-    def newGame(self, layout, pacmanAgent, ghostAgents, display, quiet=False, catchExceptions=False):
+    def newGame(self, layout, pacmanAgent, ghostAgents, display, quiet=False, catchExceptions=False, trusted=False,
+                instrumentation=None):
         agents = [pacmanAgent] + ghostAgents[:layout.getNumGhosts()]
         initState = GameState()
         initState.initialize(layout, len(ghostAgents))
-        game = Game(agents, display, self, catchExceptions=catchExceptions)
+        game = Game(agents, display, self, catchExceptions=catchExceptions,
+                    trusted=trusted, instrumentation=instrumentation)
         game.state = initState
         self.initialState = initState.deepCopy()
         self.quiet = quiet
@@ -348,7 +691,8 @@ class PacmanRules:
         """
         Returns a list of possible actions.
         """
-        return Actions.getPossibleActions(state.getPacmanState().configuration, state.data.layout.walls)
+        return state.data.layout.getActionTable().getPossibleActions(
+            state.data.agentStates[0].configuration)
     getLegalActions = staticmethod(getLegalActions)
 
     def applyAction(state, action):
@@ -363,11 +707,11 @@ class PacmanRules:
 
         # Update Configuration
         vector = Actions.directionToVector(action, PacmanRules.PACMAN_SPEED)
-        pacmanState.configuration = pacmanState.configuration.generateSuccessor(
-            vector)
+        state.data.setAgentConfiguration(
+            0, pacmanState.configuration.generateSuccessor(vector))
 
         # Eat
-        next = pacmanState.configuration.getPosition()
+        next = state.data.agentStates[0].configuration.getPosition()
         nearest = nearestPoint(next)
         if manhattanDistance(nearest, next) <= 0.5:
             # Remove food
@@ -379,21 +723,19 @@ class PacmanRules:
         # Eat food
         if state.data.food[x][y]:
             state.data.scoreChange += 10
-            state.data.food = state.data.food.copy()
-            state.data.food[x][y] = False
+            state.data.removeFood(position)
             state.data._foodEaten = position
-            # TODO: cache numFood?
             numFood = state.getNumFood()
             if numFood == 0 and not state.data._lose:
                 state.data.scoreChange += 500
                 state.data._win = True
         # Eat capsule
         if(position in state.getCapsules()):
-            state.data.capsules.remove(position)
+            state.data.removeCapsule(position)
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range(1, len(state.data.agentStates)):
-                state.data.agentStates[index].scaredTimer = SCARED_TIME
+                state.data.setScaredTimer(index, SCARED_TIME)
     consume = staticmethod(consume)
 
 
@@ -409,14 +751,7 @@ class GhostRules:
         reach a dead end, but can turn 90 degrees at intersections.
         """
         conf = state.getGhostState(ghostIndex).configuration
-        possibleActions = Actions.getPossibleActions(
-            conf, state.data.layout.walls)
-        reverse = Actions.reverseDirection(conf.direction)
-        if Directions.STOP in possibleActions:
-            possibleActions.remove(Directions.STOP)
-        if reverse in possibleActions and len(possibleActions) > 1:
-            possibleActions.remove(reverse)
-        return possibleActions
+        return state.data.layout.getActionTable().getNonReversingActions(conf)
     getLegalActions = staticmethod(getLegalActions)
 
     def applyAction(state, action, ghostIndex):
@@ -430,16 +765,18 @@ class GhostRules:
         if ghostState.scaredTimer > 0:
             speed /= 2.0
         vector = Actions.directionToVector(action, speed)
-        ghostState.configuration = ghostState.configuration.generateSuccessor(
-            vector)
+        state.data.setAgentConfiguration(
+            ghostIndex, ghostState.configuration.generateSuccessor(vector))
     applyAction = staticmethod(applyAction)
 
-    def decrementTimer(ghostState):
+    def decrementTimer(state, ghostIndex):
+        ghostState = state.data.agentStates[ghostIndex]
         timer = ghostState.scaredTimer
         if timer == 1:
-            ghostState.configuration.pos = nearestPoint(
-                ghostState.configuration.pos)
-        ghostState.scaredTimer = max(0, timer - 1)
+            configuration = ghostState.configuration
+            state.data.setAgentConfiguration(ghostIndex, Configuration.interned(
+                nearestPoint(configuration.pos), configuration.direction))
+        state.data.setScaredTimer(ghostIndex, max(0, timer - 1))
     decrementTimer = staticmethod(decrementTimer)
 
     def checkDeath(state, agentIndex):
@@ -460,8 +797,8 @@ class GhostRules:
     def collide(state, ghostState, agentIndex):
         if ghostState.scaredTimer > 0:
             state.data.scoreChange += 200
-            GhostRules.placeGhost(state, ghostState)
-            ghostState.scaredTimer = 0
+            GhostRules.placeGhost(state, agentIndex)
+            state.data.setScaredTimer(agentIndex, 0)
             # Added for first-person
             state.data._eaten[agentIndex] = True
         else:
@@ -474,8 +811,9 @@ class GhostRules:
         return manhattanDistance(ghostPosition, pacmanPosition) <= COLLISION_TOLERANCE
     canKill = staticmethod(canKill)
 
-    def placeGhost(state, ghostState):
-        ghostState.configuration = ghostState.start
+    def placeGhost(state, ghostIndex):
+        ghostState = state.data.agentStates[ghostIndex]
+        state.data.setAgentConfiguration(ghostIndex, ghostState.start)
     placeGhost = staticmethod(placeGhost)
 
 #############################
@@ -522,6 +860,8 @@ def readCommand(argv):
                       help=default(
                           'the LAYOUT_FILE from which to load the map layout'),
                       metavar='LAYOUT_FILE', default='mediumClassic')
+    parser.add_option('--generate', dest='generate',
+                      help='Generate a random maze instead of loading a layout, e.g. "width=500,height=500,loopFactor=0.3,seed=1" (see layoutGenerator.py)', default=None)
     parser.add_option('-p', '--pacman', dest='pacman',
                       help=default(
                           'the agent TYPE in the pacmanAgents module to use'),
@@ -543,7 +883,9 @@ def readCommand(argv):
     parser.add_option('-r', '--recordActions', action='store_true', dest='record',
                       help='Writes game histories to a file (named by the time they were played)', default=False)
     parser.add_option('--replay', dest='gameToReplay',
-                      help='A recorded game file (pickle) to replay', default=None)
+                      help='A recorded game file to replay', default=None)
+    parser.add_option('--replayFrom', dest='replayFrom', type='int',
+                      help=default('The move at which to start a replay'), default=0)
     parser.add_option('-a', '--agentArgs', dest='agentArgs',
                       help='Comma separated values sent to agent. e.g. "opt1=val1,opt2,opt3=val3"')
     parser.add_option('-x', '--numTraining', dest='numTraining', type='int',
@@ -554,6 +896,19 @@ def readCommand(argv):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--trusted', action='store_true', dest='trusted',
+                      help='Run agents without output muting, timing or exception handling', default=False)
+    parser.add_option('--instrument', dest='instrumentOutput',
+                      help='File (.json or .csv) receiving per-game move latency percentiles and call counts', default=None)
+    parser.add_option('-j', '--numWorkers', dest='numWorkers', type='int',
+                      help='Play the games headless in parallel on this many worker processes (0 means one per CPU)', default=None)
+    parser.add_option('--batchOutput', dest='batchOutput',
+                      help='File (.json or .csv) receiving the per-game records of a parallel run', default=None)
+    parser.add_option('--successorCache', dest='successorCache', type='int',
+                      help=default('Remember up to this many generated successors (0 turns the cache off)'), default=0)
+    parser.add_option('--exploredTracking', dest='exploredTracking', type='choice',
+                      choices=list(GameState.EXPLORED_TRACKING_MODES),
+                      help=default('How generated states are recorded: off, count, sample or full'), default='off')
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -564,14 +919,26 @@ def readCommand(argv):
     if options.fixRandomSeed:
         random.seed('cs188')
 
+    # Nothing reads the explored states during a normal run
+    GameState.setExploredTracking(options.exploredTracking)
+    if options.successorCache > 0:
+        GameState.enableSuccessorCache(options.successorCache)
+
     # Choose a layout
-    args['layout'] = layout.getLayout(options.layout)
-    if args['layout'] == None:
-        raise Exception("The layout " + options.layout + " cannot be found")
+    if options.generate != None:
+        import layoutGenerator
+        generatorArgs = layoutGenerator.parseGeneratorArgs(
+            options.generate, {'numGhosts': options.numGhosts})
+        args['layout'] = layoutGenerator.generateLayout(**generatorArgs)
+        options.numGhosts = args['layout'].getNumGhosts()
+    else:
+        args['layout'] = layout.getLayout(options.layout)
+        if args['layout'] == None:
+            raise Exception("The layout " + options.layout + " cannot be found")
 
     # Choose a Pacman agent
     noKeyboard = options.gameToReplay == None and (
-        options.textGraphics or options.quietGraphics)
+        options.textGraphics or options.quietGraphics or options.numWorkers != None)
     pacmanType = loadAgent(options.pacman, noKeyboard)
     agentOpts = parseAgentArgs(options.agentArgs)
     if options.numTraining > 0:
@@ -591,7 +958,7 @@ def readCommand(argv):
     args['ghosts'] = [ghostType(i+1) for i in range(options.numGhosts)]
 
     # Choose a display format
-    if options.quietGraphics:
+    if options.quietGraphics or options.numWorkers != None:
         import textDisplay
         args['display'] = textDisplay.NullGraphics()
     elif options.textGraphics:
@@ -606,18 +973,28 @@ def readCommand(argv):
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['trusted'] = options.trusted
+    if options.instrumentOutput != None:
+        args['instrumentOutput'] = options.instrumentOutput
+    if options.trusted and options.catchExceptions:
+        raise Exception('Trusted games cannot catch exceptions')
+
+    # Special case: parallel batches are always headless
+    if options.numWorkers != None:
+        if options.numTraining > 0 or options.record:
+            raise Exception('Parallel runs support neither training games nor recording')
+        args['numWorkers'] = options.numWorkers
+        args['batchOutput'] = options.batchOutput
+        if options.fixRandomSeed:
+            args['seed'] = 0
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
         print('Replaying recorded game %s.' % options.gameToReplay)
-        import pickle
-        f = open(options.gameToReplay)
-        try:
-            recorded = pickle.load(f)
-        finally:
-            f.close()
-        recorded['display'] = args['display']
-        replayGame(**recorded)
+        import replay
+        reader = replay.ReplayReader(options.gameToReplay)
+        replayGame(reader.layout, reader.getMoves(options.replayFrom), args['display'],
+                   reader.getState(options.replayFrom))
         sys.exit(0)
 
     return args
@@ -651,14 +1028,19 @@ def loadAgent(pacman, nographics):
                     ' is not specified in any *Agents.py.')
 
 
-def replayGame(layout, actions, display):
+def replayGame(layout, actions, display, startState=None):
     import pacmanAgents
     import ghostAgents
     rules = ClassicGameRules()
+    numGhosts = layout.getNumGhosts()
+    if startState != None:
+        numGhosts = startState.getNumAgents() - 1
     agents = [pacmanAgents.GreedyAgent()] + [ghostAgents.RandomGhost(i+1)
-                                             for i in range(layout.getNumGhosts())]
+                                             for i in range(numGhosts)]
     game = rules.newGame(layout, agents[0], agents[1:], display)
     state = game.state
+    if startState != None:
+        state = game.state = startState
     display.initialize(state.data)
 
     for action in actions:
@@ -672,12 +1054,14 @@ def replayGame(layout, actions, display):
     display.finish()
 
 
-def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, catchExceptions=False, timeout=30):
+def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, catchExceptions=False, timeout=30, trusted=False,
+             instrumentOutput=None):
     import __main__
     __main__.__dict__['_display'] = display
 
     rules = ClassicGameRules(timeout)
     games = []
+    instrumentRecords = []
 
     for i in range(numGames):
         beQuiet = i < numTraining
@@ -689,22 +1073,26 @@ def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, c
         else:
             gameDisplay = display
             rules.quiet = False
-        game = rules.newGame(layout, pacman, ghosts,
-                             gameDisplay, beQuiet, catchExceptions)
+        instrumentation = None
+        if instrumentOutput != None:
+            instrumentation = MoveInstrumentation()
+        game = rules.newGame(layout, pacman, ghosts, gameDisplay, beQuiet,
+                             catchExceptions, trusted, instrumentation)
+        if record:
+            import replay
+            fname = ('recorded-game-%d' % (i + 1)) + \
+                '-'.join([str(t) for t in time.localtime()[1:6]]) + '.replay'
+            game.recorder = replay.ReplayWriter(fname, layout, len(game.agents))
         game.run()
+        if record:
+            game.recorder.close()
+        if instrumentation != None:
+            for agentRecord in instrumentation.summarize(len(game.agents), rules):
+                agentRecord['game'] = i
+                instrumentRecords.append(agentRecord)
         if not beQuiet:
             games.append(game)
 
-        if record:
-            import time
-            import pickle
-            fname = ('recorded-game-%d' % (i + 1)) + \
-                '-'.join([str(t) for t in time.localtime()[1:6]])
-            f = file(fname, 'w')
-            components = {'layout': layout, 'actions': game.moveHistory}
-            pickle.dump(components, f)
-            f.close()
-
     if (numGames-numTraining) > 0:
         scores = [game.state.getScore() for game in games]
         wins = [game.state.isWin() for game in games]
@@ -716,9 +1104,145 @@ def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, c
         print('Record:       ', ', '.join(
             [['Loss', 'Win'][int(w)] for w in wins]))
 
+    if instrumentOutput != None:
+        writeInstrumentation(instrumentRecords, instrumentOutput)
     return games
 
 
+def writeInstrumentation(records, outputFile):
+    """
+    Saves per-game, per-agent MoveInstrumentation records as CSV (if the name
+    ends in .csv) or JSON.
+    """
+    import json
+    fields = ['game'] + MoveInstrumentation.RECORD_FIELDS
+    with open(outputFile, 'w', newline='') as out:
+        if outputFile.endswith('.csv'):
+            import csv
+            writer = csv.DictWriter(out, fields)
+            writer.writeheader()
+            writer.writerows(records)
+        else:
+            json.dump({'fields': fields, 'records': records}, out)
+
+
+BATCH_RECORD_FIELDS = ['game', 'seed', 'score', 'win', 'moves', 'agentTimes']
+
+# Per-process game setup for runGamesParallel workers
+_batchSetup = None
+
+
+def _initBatchWorker(layout, pacman, ghosts, timeout, catchExceptions, trusted):
+    global _batchSetup
+    GameState.setExploredTracking('off')
+    _batchSetup = (layout, pacman, ghosts, timeout, catchExceptions, trusted)
+
+
+def _runBatchGame(task):
+    """
+    Plays one headless game in a worker and returns its compact record.
+    The game gets fresh copies of the agents the worker was set up with.
+    """
+    import copy
+    import textDisplay
+    gameIndex, seed = task
+    layout, pacman, ghosts, timeout, catchExceptions, trusted = _batchSetup
+    pacman, ghosts = copy.deepcopy((pacman, ghosts))
+    random.seed(seed)
+    rules = ClassicGameRules(timeout)
+    game = rules.newGame(layout, pacman, ghosts, textDisplay.NullGraphics(),
+                         True, catchExceptions, trusted)
+    game.run()
+    return {'game': gameIndex, 'seed': seed, 'score': game.state.getScore(),
+            'win': game.state.isWin(), 'moves': len(game.moveHistory),
+            'agentTimes': [round(t, 6) for t in game.totalAgentTimes]}
+
+
+def summarizeBatch(records, elapsed=None):
+    """
+    Combines per-game batch records into summary statistics.
+    """
+    numGames = len(records)
+    scores = [r['score'] for r in records]
+    wins = [r['win'] for r in records].count(True)
+    numAgents = max([len(r['agentTimes']) for r in records] + [0])
+    agentTimes = [sum([r['agentTimes'][i] for r in records if i < len(r['agentTimes'])])
+                  for i in range(numAgents)]
+    summary = {'numGames': numGames, 'wins': wins,
+               'winRate': wins / float(numGames) if numGames else 0.0,
+               'averageScore': sum(scores) / float(numGames) if numGames else 0.0,
+               'minScore': min(scores) if scores else None,
+               'maxScore': max(scores) if scores else None,
+               'averageMoves': sum([r['moves'] for r in records]) / float(numGames) if numGames else 0.0,
+               'averageAgentTimes': [t / numGames for t in agentTimes]}
+    if elapsed is not None:
+        summary['elapsed'] = elapsed
+        summary['gamesPerSecond'] = numGames / elapsed if elapsed > 0 else None
+    return summary
+
+
+def runGamesParallel(layout, pacman, ghosts, numGames, numWorkers=None, seed=None,
+                     timeout=30, catchExceptions=False, outputFile=None, trusted=False):
+    """
+    Plays numGames headless games spread over a pool of worker processes.
+
+    Every game is played by fresh copies of the agents as they were passed
+    in, with a NullGraphics display, and game i is seeded with seed + i, so
+    results do not depend on the number of workers, even for agents that
+    keep state.  (runGames, by contrast, reuses one set of agents for all
+    games.)  Only compact per-game records travel back; they are streamed
+    into outputFile (CSV if the name ends in .csv, JSON otherwise) as they
+    arrive.  Returns the records ordered by game.  Trusted games (see
+    Game.runTrusted) record no agent times.
+    """
+    import multiprocessing
+    import json
+    if seed == None:
+        seed = random.randrange(2 ** 31)
+    if numWorkers == None or numWorkers <= 0:
+        numWorkers = multiprocessing.cpu_count()
+    tasks = [(i, seed + i) for i in range(numGames)]
+    chunkSize = max(1, numGames // (numWorkers * 8))
+
+    records = []
+    out = None
+    writer = None
+    if outputFile != None:
+        out = open(outputFile, 'w', newline='')
+        if outputFile.endswith('.csv'):
+            import csv
+            writer = csv.writer(out)
+            writer.writerow(BATCH_RECORD_FIELDS)
+    startTime = time.time()
+    pool = multiprocessing.Pool(numWorkers, _initBatchWorker,
+                                (layout, pacman, ghosts, timeout, catchExceptions, trusted))
+    try:
+        for record in pool.imap_unordered(_runBatchGame, tasks, chunkSize):
+            records.append(record)
+            if writer != None:
+                writer.writerow([record[field] if field != 'agentTimes' else
+                                 ' '.join([str(t) for t in record[field]])
+                                 for field in BATCH_RECORD_FIELDS])
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    records.sort(key=lambda r: r['game'])
+    summary = summarizeBatch(records, time.time() - startTime)
+    if out != None:
+        if writer == None:
+            json.dump({'summary': summary, 'games': records}, out)
+        out.close()
+
+    print('Games:         %d on %d workers (%.1f games/s)' %
+          (summary['numGames'], numWorkers, summary['gamesPerSecond'] or 0))
+    print('Average Score:', summary['averageScore'])
+    print('Win Rate:      %d/%d (%.2f)' %
+          (summary['wins'], summary['numGames'], summary['winRate']))
+    print('Average Moves:', summary['averageMoves'])
+    return records
+
+
 if __name__ == '__main__':
     """
     The main function called when pacman.py is run
@@ -731,7 +1255,15 @@ if __name__ == '__main__':
     > python pacman.py --help
     """
     args = readCommand(sys.argv[1:])  # Get game components based on input
-    runGames(**args)
+    if 'numWorkers' in args:
+        runGamesParallel(args['layout'], args['pacman'], args['ghosts'], args['numGames'],
+                         args['numWorkers'], args.get('seed'), args['timeout'],
+                         args['catchExceptions'], args['batchOutput'], args['trusted'])
+    else:
+        runGames(**args)
+    if GameState.successorCache is not None:
+        print('Successor cache: %(hits)d hits, %(misses)d misses, %(size)d of %(maxSize)d entries'
+              % GameState.getSuccessorCacheStats())
 
     # import cProfile
     # cProfile.run("runGames( **args )")
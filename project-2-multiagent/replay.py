@@ -0,0 +1,376 @@
+# replay.py
+# ---------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A compact binary format for recorded games.
+
+A replay file starts with a header naming the layout by the SHA-1 of its
+text, the number of agents and the checkpoint interval.  Layouts that are
+not files in layouts/ (such as those made with --generate) have their text
+stored in the header too, zlib-compressed, so that the replay can be
+opened on its own.  Then comes one
+varint per move, agentIndex * 8 + action code, and every checkpointInterval
+moves a checkpoint holding the full game state after that move.  Closing the
+writer appends an index of the checkpoints, so a reader can jump to any
+move by decoding the nearest checkpoint and replaying at most
+checkpointInterval moves.  Files whose writer never closed (e.g. after a
+crash) are still readable; the reader then scans them once.
+
+  > writer = ReplayWriter('game.replay', layout, numAgents)
+  > writer.recordMove(agentIndex, action, state)    # after every move
+  > writer.close()
+  > reader = ReplayReader('game.replay')
+  > state = reader.getState(120)                     # after the 120th move
+"""
+
+import hashlib
+import os
+import struct
+import zlib
+
+from game import BitboardStateData
+from game import BitboardStatics
+from game import Directions
+import layout as layoutModule
+
+MAGIC = b'PACREPLAY\x02'
+# Files written before layouts could be embedded; their header has no
+# layout text field
+MAGIC_V1 = b'PACREPLAY\x01'
+FOOTER = b'PACINDEX'
+ACTIONS = [Directions.NORTH, Directions.SOUTH,
+           Directions.EAST, Directions.WEST, Directions.STOP]
+ACTION_CODES = dict((action, code) for code, action in enumerate(ACTIONS))
+INDEX_TAG = 6
+CHECKPOINT_TAG = 7
+DEFAULT_CHECKPOINT_INTERVAL = 200
+# The digests of the layout files findLayout has read, by path
+LAYOUT_DIGESTS = {}
+
+
+def layoutDigest(layout):
+    """
+    The SHA-1 of a layout's text, which replay files use to refer to it.
+    """
+    return hashlib.sha1('\n'.join(layout.layoutText).encode('utf-8')).digest()
+
+
+def findLayout(digest):
+    """
+    Looks for the layout file whose text has the given digest.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    for directory in ['layouts', os.path.join(here, 'layouts')]:
+        indexed = layoutModule.indexLayouts(directory)
+        for fileName in sorted(indexed):
+            path = indexed[fileName]
+            if path not in LAYOUT_DIGESTS:
+                candidate = layoutModule.loadLayout(path)
+                LAYOUT_DIGESTS[path] = candidate and layoutDigest(candidate)
+            if LAYOUT_DIGESTS[path] == digest:
+                return layoutModule.loadLayout(path).deepCopy()
+    return None
+
+
+def encodeVarint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decodeVarint(buffer, pos):
+    """
+    Returns the varint starting at buffer[pos] and the position after it.
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = buffer[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value):
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+
+def undouble(value):
+    """
+    Halves a doubled coordinate, keeping whole cells as ints for indexing.
+    """
+    if value % 2 == 0:
+        return value // 2
+    return value / 2.0
+
+
+def encodeCheckpoint(moveIndex, state):
+    """
+    Packs a GameState (with integral score) into a checkpoint payload.
+    Positions are stored doubled, since scared ghosts stop between cells.
+    """
+    data = BitboardStateData.fromGameStateData(state.data)
+    food = data.food.to_bytes((data.food.bit_length() + 7) // 8, 'little')
+    parts = [moveIndex, data.numFood, zigzag(int(data.score)),
+             int(data._win) | int(data._lose) << 1, data.capsules, len(food)]
+    out = [encodeVarint(part) for part in parts]
+    out.append(food)
+    for agentIndex in range(data.getNumAgents()):
+        x, y, direction, scaredTimer = data.getAgent(agentIndex)
+        out.extend([encodeVarint(zigzag(int(x * 2))), encodeVarint(zigzag(int(y * 2))),
+                    encodeVarint(ACTION_CODES[direction]), encodeVarint(scaredTimer)])
+    return b''.join(out)
+
+
+class ReplayWriter:
+    """
+    Streams the moves of one game into a replay file.
+
+    The layout text goes into the header if embedLayout is True, or, by
+    default, if findLayout cannot find the layout from its digest.
+    """
+
+    def __init__(self, fileName, layout, numAgents, checkpointInterval=DEFAULT_CHECKPOINT_INTERVAL,
+                 embedLayout=None):
+        digest = layoutDigest(layout)
+        if embedLayout == None:
+            embedLayout = findLayout(digest) == None
+        layoutText = b''
+        if embedLayout:
+            layoutText = zlib.compress('\n'.join(layout.layoutText).encode('utf-8'))
+        self.out = open(fileName, 'wb')
+        self.checkpointInterval = checkpointInterval
+        self.numMoves = 0
+        self.checkpoints = []
+        self.out.write(MAGIC)
+        self.out.write(digest)
+        self.out.write(encodeVarint(len(layoutText)))
+        self.out.write(layoutText)
+        self.out.write(encodeVarint(numAgents))
+        self.out.write(encodeVarint(checkpointInterval))
+
+    def recordMove(self, agentIndex, action, state):
+        """
+        Records a move; state is the game state right after it.
+        """
+        self.out.write(encodeVarint(agentIndex * 8 + ACTION_CODES[action]))
+        self.numMoves += 1
+        if self.numMoves % self.checkpointInterval == 0:
+            payload = encodeCheckpoint(self.numMoves, state)
+            self.out.write(encodeVarint(CHECKPOINT_TAG))
+            self.checkpoints.append((self.numMoves, self.out.tell()))
+            self.out.write(encodeVarint(len(payload)))
+            self.out.write(payload)
+
+    def close(self):
+        """
+        Writes the checkpoint index and closes the file.
+        """
+        indexStart = self.out.tell()
+        parts = [INDEX_TAG, self.numMoves, len(self.checkpoints)]
+        for moveIndex, offset in self.checkpoints:
+            parts.extend([moveIndex, offset])
+        self.out.write(b''.join([encodeVarint(part) for part in parts]))
+        self.out.write(struct.pack('>Q', indexStart))
+        self.out.write(FOOTER)
+        self.out.close()
+
+
+class ReplayReader:
+    """
+    Random access to the moves and states of a replay file.
+    """
+
+    def __init__(self, fileName, layout=None):
+        """
+        Without a layout, the layout stored in the file is used, or else the
+        one with the same digest in layouts/.
+        """
+        f = open(fileName, 'rb')
+        try:
+            self.buffer = f.read()
+        finally:
+            f.close()
+        if not self.buffer.startswith(MAGIC) and not self.buffer.startswith(MAGIC_V1):
+            raise Exception('%s is not a replay file' % fileName)
+        pos = len(MAGIC)
+        digest = self.buffer[pos:pos + 20]
+        pos += 20
+        layoutText = b''
+        if self.buffer.startswith(MAGIC):
+            length, pos = decodeVarint(self.buffer, pos)
+            layoutText = self.buffer[pos:pos + length]
+            pos += length
+        if layout == None:
+            if layoutText:
+                text = zlib.decompress(layoutText).decode('utf-8')
+                layout = layoutModule.Layout(text.split('\n'))
+            else:
+                layout = findLayout(digest)
+            if layout == None:
+                raise Exception('No layout matches the replay %s' % fileName)
+        elif layoutDigest(layout) != digest:
+            raise Exception('The replay %s was recorded on another layout' % fileName)
+        self.layout = layout
+        self.numAgents, pos = decodeVarint(self.buffer, pos)
+        self.checkpointInterval, pos = decodeVarint(self.buffer, pos)
+        self.bodyStart = pos
+        self._statics = None
+        self._readIndex()
+
+    def _readIndex(self):
+        """
+        Reads the checkpoint index, or rebuilds it if the file has none.
+        """
+        self.checkpoints = []
+        buffer = self.buffer
+        if buffer.endswith(FOOTER):
+            indexStart = struct.unpack(
+                '>Q', buffer[-len(FOOTER) - 8:-len(FOOTER)])[0]
+            tag, pos = decodeVarint(buffer, indexStart)
+            self.numMoves, pos = decodeVarint(buffer, pos)
+            numCheckpoints, pos = decodeVarint(buffer, pos)
+            for i in range(numCheckpoints):
+                moveIndex, pos = decodeVarint(buffer, pos)
+                offset, pos = decodeVarint(buffer, pos)
+                self.checkpoints.append((moveIndex, offset))
+            self.bodyEnd = indexStart
+            return
+        self.numMoves = 0
+        self.bodyEnd = len(buffer)
+        pos = self.bodyStart
+        while pos < self.bodyEnd:
+            try:
+                value, after = decodeVarint(buffer, pos)
+                if value == CHECKPOINT_TAG:
+                    length, end = decodeVarint(buffer, after)
+                    if end + length > self.bodyEnd:
+                        break
+                    self.checkpoints.append((self.numMoves, after))
+                    after = end + length
+                elif value == INDEX_TAG:
+                    break
+                else:
+                    self.numMoves += 1
+            except IndexError:
+                break  # A move cut short by a crash
+            pos = after
+        self.bodyEnd = pos
+
+    def _moves(self, pos):
+        """
+        Yields the (agentIndex, action) moves from a body position on.
+        """
+        buffer = self.buffer
+        while pos < self.bodyEnd:
+            value, pos = decodeVarint(buffer, pos)
+            if value == CHECKPOINT_TAG:
+                length, pos = decodeVarint(buffer, pos)
+                pos += length
+            elif value == INDEX_TAG:
+                return
+            else:
+                yield value >> 3, ACTIONS[value & 7]
+
+    def getMoves(self, start=0):
+        """
+        The (agentIndex, action) moves from move start on.
+        """
+        self._checkMoveIndex(start)
+        moveIndex, state, pos = self._seek(start, withState=False)
+        moves = self._moves(pos)
+        for i in range(start - moveIndex):
+            next(moves)
+        return list(moves)
+
+    def getState(self, moveIndex):
+        """
+        The GameState after the first moveIndex moves.
+        """
+        self._checkMoveIndex(moveIndex)
+        start, state, pos = self._seek(moveIndex)
+        moves = self._moves(pos)
+        for i in range(moveIndex - start):
+            state = state.generateSuccessor(*next(moves))
+        return state
+
+    def _checkMoveIndex(self, moveIndex):
+        if moveIndex < 0 or moveIndex > self.numMoves:
+            raise Exception('No move %d in a replay of %d moves' %
+                            (moveIndex, self.numMoves))
+
+    def _seek(self, moveIndex, withState=True):
+        """
+        Finds the last checkpoint at or before moveIndex.  Returns its move
+        index, its state (if asked for) and the body position after it.
+        """
+        best = None
+        for checkpoint in self.checkpoints:
+            if checkpoint[0] <= moveIndex:
+                best = checkpoint
+        if best == None:
+            state = None
+            if withState:
+                state = self.getInitialState()
+            return 0, state, self.bodyStart
+        start, offset = best
+        length, pos = decodeVarint(self.buffer, offset)
+        state = None
+        if withState:
+            state = self._decodeCheckpoint(pos)
+        return start, state, pos + length
+
+    def getInitialState(self):
+        import pacman
+        state = pacman.GameState()
+        state.initialize(self.layout, self.numAgents - 1)
+        return state
+
+    def _decodeCheckpoint(self, pos):
+        import pacman
+        buffer = self.buffer
+        fields = []
+        for i in range(6):
+            value, pos = decodeVarint(buffer, pos)
+            fields.append(value)
+        moveIndex, numFood, score, flags, capsules, foodLength = fields
+        food = int.from_bytes(buffer[pos:pos + foodLength], 'little')
+        pos += foodLength
+        agents = []
+        for agentIndex in range(self.numAgents):
+            x, pos = decodeVarint(buffer, pos)
+            y, pos = decodeVarint(buffer, pos)
+            direction, pos = decodeVarint(buffer, pos)
+            scaredTimer, pos = decodeVarint(buffer, pos)
+            agents.extend((undouble(unzigzag(x)), undouble(unzigzag(y)),
+                           ACTIONS[direction], scaredTimer))
+        if self._statics == None:
+            agentStates = self.getInitialState().data.agentStates
+            self._statics = BitboardStatics(self.layout,
+                                            [s.start.getPosition() for s in agentStates],
+                                            [s.isPacman for s in agentStates])
+        data = BitboardStateData(self._statics, food, capsules, tuple(agents), numFood,
+                                 unzigzag(score), bool(flags & 1), bool(flags & 2))
+        state = pacman.GameState()
+        state.data = data.toGameStateData()
+        return state
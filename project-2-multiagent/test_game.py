@@ -0,0 +1,508 @@
+# test_game.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Tests for the game engine.  Run them from this directory with
+
+  > python -m unittest test_game
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import layout
+import layoutGenerator
+import replay
+import textDisplay
+from game import Agent
+from game import Configuration
+from game import Directions
+from game import Grid
+from game import MoveInstrumentation
+from ghostAgents import DirectionalGhost
+from ghostAgents import RandomGhost
+from pacman import ClassicGameRules
+from pacman import GameState
+from pacman import runGamesParallel
+from pacmanAgents import GreedyAgent
+from util import TimeoutFunction
+from util import TimeoutFunctionException
+
+
+def snapshot(state):
+    """
+    Everything about a state that an agent could try to change.
+    """
+    data = state.data
+    return (hash(state), data.numFood, data.food.copy(), list(data.foodPositions),
+            [(agentState.configuration, agentState.scaredTimer)
+             for agentState in data.agentStates])
+
+
+class MutatingAgent(Agent):
+    """
+    A Pacman that stands still after trying to edit the food, the positions
+    and the scared timers of the state it observes.  It checks that the game
+    state it was handed a copy of did not change.
+    """
+
+    def __init__(self, test):
+        Agent.__init__(self, 0)
+        self.test = test
+        self.game = None
+        self.moves = 0
+
+    def getAction(self, state):
+        before = snapshot(self.game.state)
+        x, y = state.getFoodPositions()[0]
+        with self.test.assertRaises(TypeError):
+            state.getFood()[x][y] = False
+        with self.test.assertRaises(TypeError):
+            state.getFood()[x] = [False] * state.getFood().height
+        state.getPacmanState().configuration = Configuration((1, 1), Directions.STOP)
+        for ghostState in state.getGhostStates():
+            ghostState.scaredTimer = 40
+        # A writable copy of the food is the agent's own to edit
+        food = state.getFood().copy()
+        food[x][y] = False
+        self.test.assertEqual(before, snapshot(self.game.state))
+        self.moves += 1
+        return Directions.STOP
+
+
+class GridTest(unittest.TestCase):
+
+    def setUp(self):
+        self.grid = Grid(3, 4)
+        self.grid[1][2] = True
+
+    def testColumnsCompareLikeLists(self):
+        self.assertEqual([False, False, True, False], self.grid[1])
+        self.assertTrue(self.grid[1] == [False, False, True, False])
+        self.assertTrue(self.grid[1] != [False] * 4)
+        self.assertNotEqual(self.grid[0], self.grid[1])
+        self.assertEqual(self.grid[0], self.grid[2])
+        self.assertEqual('[False, False, True, False]', repr(self.grid[1]))
+        self.assertEqual('[False, False, True, False]', str(self.grid[1]))
+
+    def testSlicing(self):
+        self.assertEqual([[False] * 4, [False, False, True, False]], self.grid[0:2])
+        self.assertEqual([[False] * 4], self.grid[-1:])
+        self.assertEqual([False, True], self.grid[1][1:3])
+        self.grid[1][0:2] = [True, True]
+        self.assertEqual([True, True, True, False], self.grid[1])
+
+    def testOnlyBooleansCanBeStored(self):
+        for value in [None, 'x', 2, [True]]:
+            self.assertRaises(TypeError, self.grid[1].__setitem__, 0, value)
+            self.assertRaises(TypeError, self.grid.__setitem__, 1, [value] * 4)
+        self.assertRaises(TypeError, self.grid[1].__setitem__, slice(0, 2), [True, None])
+        self.assertEqual([False, False, True, False], self.grid[1])
+        self.grid[1][0] = 1
+        self.assertTrue(self.grid[1][0] is True)
+
+    def testReadOnlyColumns(self):
+        view = self.grid.readOnlyView()
+        self.assertEqual(self.grid[1], view[1])
+        self.assertRaises(TypeError, view[1].__setitem__, 2, False)
+        self.grid[1][3] = True
+        self.assertTrue(view[1][3])
+
+
+class ObservationTest(unittest.TestCase):
+
+    def playMutatingGame(self, trusted):
+        random.seed(0)
+        pacman = MutatingAgent(self)
+        game = ClassicGameRules().newGame(
+            layout.getLayout('smallClassic'), pacman,
+            [DirectionalGhost(1), DirectionalGhost(2)],
+            textDisplay.NullGraphics(), True, trusted=trusted)
+        pacman.game = game
+        game.run()
+        self.assertTrue(pacman.moves > 0)
+        # The incremental bookkeeping still matches the board
+        data = game.state.data
+        self.assertEqual(data.numFood, data.food.count())
+        self.assertEqual(list(data.foodPositions), data.food.asList())
+        rebuilt = game.state.deepCopy()
+        rebuilt.data.rehash()
+        self.assertEqual(hash(game.state), hash(rebuilt))
+
+    def testMutatingAgentLeavesGameUnchanged(self):
+        self.playMutatingGame(trusted=False)
+
+    def testMutatingAgentLeavesTrustedGameUnchanged(self):
+        self.playMutatingGame(trusted=True)
+
+    def testSuccessorsOfObservationsStayConsistent(self):
+        state = ClassicGameRules().newGame(
+            layout.getLayout('smallClassic'), Agent(), [], textDisplay.NullGraphics(),
+            True).state
+        observation = state.shallowCopy()
+        before = snapshot(state)
+        for action in observation.getLegalActions(0):
+            successor = observation.generateSuccessor(0, action)
+            self.assertEqual(successor.getNumFood(), successor.getFood().count())
+        self.assertEqual(before, snapshot(state))
+
+
+class CountingGreedyAgent(GreedyAgent):
+    """
+    A GreedyAgent that notes how many successors it generates each move: one
+    per legal action, each scored once.
+    """
+
+    def __init__(self):
+        GreedyAgent.__init__(self)
+        self.expected = []
+
+    def getAction(self, state):
+        legal = state.getLegalActions()
+        if Directions.STOP in legal:
+            legal.remove(Directions.STOP)
+        self.expected.append(len(legal))
+        return GreedyAgent.getAction(self, state)
+
+
+class EvaluatingAgent(Agent):
+    """
+    Picks the legal action whose successor scores best, scoring with a method
+    (as ReflexAgent does) rather than an evaluationFunction attribute.
+    """
+
+    def evaluationFunction(self, state):
+        return state.getScore()
+
+    def getAction(self, state):
+        successors = [(self.evaluationFunction(state.generateSuccessor(0, action)), action)
+                      for action in state.getLegalPacmanActions()]
+        return max(successors)[1]
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def playInstrumentedGame(self, results, slot):
+        pacman = CountingGreedyAgent()
+        evaluationFunction = pacman.evaluationFunction
+        instrumentation = MoveInstrumentation()
+        game = ClassicGameRules().newGame(
+            layout.getLayout('mediumClassic'), pacman,
+            [RandomGhost(1), RandomGhost(2)], textDisplay.NullGraphics(), True,
+            trusted=True, instrumentation=instrumentation)
+        game.run()
+        # The agent got its own evaluation function back
+        self.assertTrue(pacman.evaluationFunction is evaluationFunction)
+        results[slot] = (pacman.expected, instrumentation.moves)
+
+    def testConcurrentGamesCountTheirOwnCalls(self):
+        generateSuccessor = GameState.__dict__['generateSuccessor']
+        results = [None] * 4
+        threads = [threading.Thread(target=self.playInstrumentedGame, args=(results, slot))
+                   for slot in range(len(results))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for expected, moves in results:
+            pacmanMoves = [move for move in moves if move[0] == 0]
+            self.assertEqual(expected, [move[2] for move in pacmanMoves])
+            self.assertEqual(expected, [move[3] for move in pacmanMoves])
+            ghostMoves = [move for move in moves if move[0] != 0]
+            self.assertEqual([0] * len(ghostMoves), [move[2] for move in ghostMoves])
+        # Nothing was left patched or counting
+        self.assertTrue(GameState.__dict__['generateSuccessor'] is generateSuccessor)
+        self.assertEqual(0, MoveInstrumentation.active)
+
+    def testAgentWithEvaluationMethodIsLeftAsItWas(self):
+        pacman = EvaluatingAgent()
+        instrumentation = MoveInstrumentation()
+        ClassicGameRules().newGame(
+            layout.getLayout('smallClassic'), pacman, [RandomGhost(1), RandomGhost(2)],
+            textDisplay.NullGraphics(), True, trusted=True,
+            instrumentation=instrumentation).run()
+        self.assertFalse('evaluationFunction' in vars(pacman))
+        pacmanMoves = [move for move in instrumentation.moves if move[0] == 0]
+        self.assertEqual([move[2] for move in pacmanMoves], [move[3] for move in pacmanMoves])
+
+
+class PrintingAgent(GreedyAgent):
+    """
+    A GreedyAgent that prints its name on every move.
+    """
+
+    def __init__(self, name):
+        GreedyAgent.__init__(self)
+        self.name = name
+
+    def getAction(self, state):
+        print(self.name)
+        return GreedyAgent.getAction(self, state)
+
+
+class TimeoutTest(unittest.TestCase):
+
+    def testZeroMeansNoLimit(self):
+        slow = TimeoutFunction(lambda: time.sleep(0.05) or 'done', 0, useSignals=False)
+        self.assertEqual('done', slow())
+
+    def testSupervisedCallTimesOut(self):
+        release = threading.Event()
+        stuck = TimeoutFunction(release.wait, 0.01, useSignals=False)
+        try:
+            self.assertRaises(TimeoutFunctionException, stuck)
+        finally:
+            release.set()
+
+    def testRunawayCallsAreCapped(self):
+        release = threading.Event()
+        stuck = TimeoutFunction(release.wait, 0.01, useSignals=False)
+        try:
+            for call in range(TimeoutFunction.MAX_RUNAWAY_CALLS):
+                self.assertRaises(TimeoutFunctionException, stuck)
+            threads = threading.active_count()
+            self.assertRaises(TimeoutFunctionException,
+                              TimeoutFunction(lambda: None, 1, useSignals=False))
+            self.assertEqual(threads, threading.active_count())
+        finally:
+            release.set()
+        for worker in list(TimeoutFunction.runawayWorkers()):
+            worker.join()
+        self.assertEqual('done', TimeoutFunction(lambda: 'done', 1, useSignals=False)())
+
+    def testRunawayCallsOnlyHoldUpTheirOwnThread(self):
+        release = threading.Event()
+        stuck = TimeoutFunction(release.wait, 0.01, useSignals=False)
+        saturated = threading.Event()
+        runaways = []
+
+        def leaveRunaways():
+            try:
+                for call in range(TimeoutFunction.MAX_RUNAWAY_CALLS):
+                    self.assertRaises(TimeoutFunctionException, stuck)
+                runaways.extend(TimeoutFunction.runawayWorkers())
+            finally:
+                saturated.set()
+            release.wait()
+        slowGame = threading.Thread(target=leaveRunaways)
+        slowGame.start()
+        try:
+            saturated.wait()
+            self.assertEqual(TimeoutFunction.MAX_RUNAWAY_CALLS, len(runaways))
+            games = {}
+            healthyGame = threading.Thread(target=self.playMutedGame, args=(games, 'healthy'))
+            healthyGame.start()
+            healthyGame.join()
+            self.assertFalse(games['healthy'].agentTimeout)
+            self.assertFalse(games['healthy'].agentCrashed)
+        finally:
+            release.set()
+            slowGame.join()
+        for worker in runaways:
+            worker.join()
+
+    def playMutedGame(self, games, name):
+        pacman = PrintingAgent(name)
+        game = ClassicGameRules().newGame(
+            layout.getLayout('smallClassic'), pacman,
+            [RandomGhost(1), RandomGhost(2)], textDisplay.NullGraphics(), True,
+            catchExceptions=True)
+        game.muteAgents = True
+        game.run()
+        games[name] = game
+
+    def testConcurrentMutedGamesKeepTheirOutput(self):
+        games = {}
+        threads = [threading.Thread(target=self.playMutedGame, args=(games, name))
+                   for name in ['first', 'second', 'third']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for name, game in games.items():
+            lines = game.agentOutput[0].getvalue().split()
+            self.assertTrue(len(lines) > 0)
+            self.assertEqual([name] * len(lines), lines)
+
+
+class VisibilityTest(unittest.TestCase):
+
+    def testSightStopsAtTheFirstWall(self):
+        walls = layout.Layout(['%%%%%%',
+                               '%P  %%',
+                               '%%%%%%']).walls
+        visibility = layout.VisibilityIndex(walls)
+        self.assertEqual([(1.5, 1), (2, 1), (2.5, 1), (3, 1), (3.5, 1)],
+                         visibility.getVisiblePositions((1, 1), Directions.EAST))
+        self.assertTrue(visibility.isVisible((3, 1), (1, 1), Directions.EAST))
+        self.assertTrue(visibility.isVisible((3.5, 1), (1, 1), Directions.EAST))
+        self.assertFalse(visibility.isVisible((4, 1), (1, 1), Directions.EAST))
+        self.assertFalse(visibility.isVisible((3, 1), (1, 1), Directions.WEST))
+        self.assertFalse(visibility.isVisible((2.25, 1), (1, 1), Directions.EAST))
+        self.assertFalse(visibility.isVisible((1, 1), (1, 1), Directions.EAST))
+        self.assertEqual([(1, 1.5)], visibility.getVisiblePositions((1, 1), Directions.NORTH))
+        self.assertEqual([], visibility.getVisiblePositions((1, 1), Directions.STOP))
+
+
+class InterningTest(unittest.TestCase):
+
+    def testInternedConfigurationsAreBounded(self):
+        maxInterned = Configuration.MAX_INTERNED
+        Configuration.MAX_INTERNED = 10
+        try:
+            first = Configuration.interned((1, 1), Directions.NORTH)
+            self.assertTrue(first is Configuration.interned((1, 1), Directions.NORTH))
+            for x in range(100):
+                Configuration.interned((x, 2), Directions.EAST)
+                self.assertTrue(len(Configuration.INTERNED) <= 10)
+            self.assertEqual(first, Configuration.interned((1, 1), Directions.NORTH))
+            self.assertEqual(float, type(Configuration.interned((1, 1.0), Directions.NORTH).pos[1]))
+        finally:
+            Configuration.MAX_INTERNED = maxInterned
+
+
+class GameCountingAgent(GreedyAgent):
+    """
+    A GreedyAgent that waits for one move per game it has played before, so
+    its results depend on what it remembers from earlier games.
+    """
+
+    def __init__(self):
+        GreedyAgent.__init__(self)
+        self.gamesPlayed = 0
+
+    def registerInitialState(self, state):
+        self.gamesPlayed += 1
+        self.waits = self.gamesPlayed - 1
+
+    def getAction(self, state):
+        if self.waits > 0:
+            self.waits -= 1
+            return Directions.STOP
+        return GreedyAgent.getAction(self, state)
+
+
+class ParallelGamesTest(unittest.TestCase):
+
+    def testResultsDoNotDependOnTheWorkerCount(self):
+        results = []
+        for numWorkers in [1, 3]:
+            records = runGamesParallel(
+                layout.getLayout('smallClassic'), GameCountingAgent(),
+                [RandomGhost(1), RandomGhost(2)], 6, numWorkers, seed=0, trusted=True)
+            results.append([(record['score'], record['moves']) for record in records])
+        self.assertEqual(results[0], results[1])
+
+
+
+class SuccessorCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.successorCache = GameState.successorCache
+        GameState.enableSuccessorCache()
+
+    def tearDown(self):
+        GameState.successorCache = self.successorCache
+
+    def startState(self, layoutText):
+        state = GameState()
+        state.initialize(layout.Layout(layoutText), 0)
+        return state
+
+    def testStatesOnOtherWallsDoNotShareSuccessors(self):
+        opened = self.startState(['%%%%%%', '%P  .%', '%%%%%%'])
+        walled = self.startState(['%%%%%%', '%P% .%', '%%%%%%'])
+        self.assertEqual(opened, walled)
+        self.assertEqual((2, 1), opened.generateSuccessor(0, Directions.EAST).getPacmanPosition())
+        self.assertRaises(Exception, walled.generateSuccessor, 0, Directions.EAST)
+
+    def testLayoutsWithTheSameWallsShareSuccessors(self):
+        first = self.startState(['%%%%%%', '%P  .%', '%%%%%%'])
+        second = self.startState(['%%%%%%', '%P  .%', '%%%%%%'])
+        successor = first.generateSuccessor(0, Directions.EAST)
+        self.assertTrue(successor is second.generateSuccessor(0, Directions.EAST))
+
+
+class LayoutCacheTest(unittest.TestCase):
+
+    def testChangingALoadedLayoutLeavesTheCacheAlone(self):
+        original = layout.tryToLoad(layout.findLayoutFile('smallClassic'))
+        layout.getLayout('smallClassic').getActionTable()
+        changed = layout.getLayout('smallClassic')
+        x, y = changed.food.asList()[0]
+        changed.food[x][y] = False
+        changed.walls[x][y] = True
+        changed.capsules.pop()
+        changed.agentPositions.pop()
+        changed.layoutText[0] = ''
+        loaded = layout.getLayout('smallClassic')
+        for attribute in ['walls', 'food', 'capsules', 'agentPositions', 'layoutText']:
+            self.assertEqual(getattr(original, attribute), getattr(loaded, attribute), attribute)
+        # The changed walls get a table of their own
+        self.assertFalse(changed.getActionTable() is loaded.getActionTable())
+
+class ReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def recordGame(self, gameLayout):
+        random.seed(0)
+        fileName = os.path.join(self.directory, 'game.replay')
+        game = ClassicGameRules().newGame(
+            gameLayout, GreedyAgent(), [RandomGhost(1), RandomGhost(2)],
+            textDisplay.NullGraphics(), True)
+        game.recorder = replay.ReplayWriter(fileName, gameLayout, len(game.agents))
+        game.run()
+        game.recorder.close()
+        return fileName, game
+
+    def testGeneratedLayoutOpensWithoutALayout(self):
+        generated = layoutGenerator.generateLayout(20, 11, seed=1)
+        self.assertEqual(None, replay.findLayout(replay.layoutDigest(generated)))
+        fileName, game = self.recordGame(generated)
+        reader = replay.ReplayReader(fileName)
+        self.assertEqual(generated.layoutText, reader.layout.layoutText)
+        self.assertEqual(game.moveHistory, list(reader.getMoves()))
+
+    def testMovesOutOfRange(self):
+        fileName, game = self.recordGame(layout.getLayout('smallClassic'))
+        reader = replay.ReplayReader(fileName)
+        numMoves = len(game.moveHistory)
+        self.assertEqual([], reader.getMoves(numMoves))
+        self.assertEqual(game.moveHistory[-3:], reader.getMoves(numMoves - 3))
+        for start in [-1, numMoves + 1, 99999]:
+            self.assertRaisesRegex(Exception, 'No move %d in a replay of %d moves' %
+                                   (start, numMoves), reader.getMoves, start)
+
+    def testLayoutFileIsOnlyReferenced(self):
+        smallClassic = layout.getLayout('smallClassic')
+        fileName = os.path.join(self.directory, 'empty.replay')
+        replay.ReplayWriter(fileName, smallClassic, 3, embedLayout=True).close()
+        embedded = os.path.getsize(fileName)
+        replay.ReplayWriter(fileName, smallClassic, 3).close()
+        self.assertTrue(os.path.getsize(fileName) < embedded)
+        reader = replay.ReplayReader(fileName)
+        self.assertEqual(smallClassic.layoutText, reader.layout.layoutText)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,336 @@
+# vectorSimulation.py
+# -------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A NumPy simulator that plays thousands of independent classic Pacman games in
+lockstep on one layout.  It is meant for Monte-Carlo evaluation and rollouts,
+where the object-per-state engine in pacman.py is too slow.
+
+Every game is a row in a set of arrays: Pacman's cell, the ghosts' positions,
+directions and scared timers, a food bitmask, the remaining capsules and the
+score.  Agents move in the usual order (Pacman, then each ghost) and each move
+is applied to all unfinished games at once, following ClassicGameRules:
+eating, capsules, scared ghosts at half speed, collisions, the time penalty
+and the win/lose bonuses.  The ghosts follow vectorized versions of
+RandomGhost and DirectionalGhost.
+
+Ghost positions are kept in doubled coordinates so that the half steps of
+scared ghosts stay integral.
+
+A Pacman policy is any callable taking the simulator and returning an array
+with one action index (see ACTIONS) per game; use sim.pacmanLegal() to find
+the legal ones.  For example:
+
+  > sim = LockstepSimulator(layout.getLayout('smallClassic'), 10000)
+  > results = sim.run(randomPacmanPolicy)
+  > print(results['scores'].mean(), results['wins'].mean())
+"""
+
+import numpy as np
+
+from game import Actions
+from game import Directions
+from pacman import SCARED_TIME, TIME_PENALTY
+
+ACTIONS = [Directions.NORTH, Directions.SOUTH,
+           Directions.EAST, Directions.WEST, Directions.STOP]
+NORTH, SOUTH, EAST, WEST, STOP = range(5)
+ACTION_DX = np.array([0, 0, 1, -1, 0])
+ACTION_DY = np.array([1, -1, 0, 0, 0])
+REVERSE = np.array([SOUTH, NORTH, WEST, EAST, STOP])
+
+# COLLISION_TOLERANCE (0.7) in doubled coordinates, rounded down to the grid
+COLLISION_DISTANCE = 1
+
+
+class LockstepSimulator:
+    """
+    Advances numGames independent games on one layout in lockstep.
+    """
+
+    def __init__(self, layout, numGames, ghostPolicy='random', numGhosts=None,
+                 seed=None, prob_attack=0.8, prob_scaredFlee=0.8, maxMoves=10000):
+        """
+          ghostPolicy: 'random' (RandomGhost) or 'directional' (DirectionalGhost)
+          numGhosts:   the number of ghost agents, as with pacman.py -k
+          maxMoves:    games still running after this many rounds are stopped
+        """
+        if ghostPolicy not in ('random', 'directional'):
+            raise Exception('Unknown ghost policy: ' + str(ghostPolicy))
+        self.layout = layout
+        self.numGames = numGames
+        self.ghostPolicy = ghostPolicy
+        self.prob_attack = prob_attack
+        self.prob_scaredFlee = prob_scaredFlee
+        self.maxMoves = maxMoves
+        self.random = np.random.default_rng(seed)
+        self.width, self.height = layout.width, layout.height
+        self._buildTables()
+
+        # Agents in the order GameStateData.initialize creates them
+        pacmanStart = None
+        ghostStarts = []
+        for isPacman, pos in layout.agentPositions:
+            if isPacman:
+                pacmanStart = pos
+            elif numGhosts == None or len(ghostStarts) < numGhosts:
+                ghostStarts.append(pos)
+        self.numGhosts = len(ghostStarts)
+        self.ghostStarts2 = np.array(ghostStarts, dtype=np.int64).reshape(-1, 2) * 2
+
+        n = numGames
+        self.pacmanX = np.full(n, pacmanStart[0], dtype=np.int64)
+        self.pacmanY = np.full(n, pacmanStart[1], dtype=np.int64)
+        self.ghostX2 = np.tile(self.ghostStarts2[:, 0], (n, 1))
+        self.ghostY2 = np.tile(self.ghostStarts2[:, 1], (n, 1))
+        self.ghostDir = np.full((n, self.numGhosts), STOP, dtype=np.int64)
+        self.scaredTimers = np.zeros((n, self.numGhosts), dtype=np.int64)
+        self.food = np.tile(self.initialFood, (n, 1))
+        self.numFood = np.full(n, len(self.foodCells), dtype=np.int64)
+        self.capsules = np.ones((n, len(self.capsuleCells)), dtype=bool)
+        self.scores = np.zeros(n, dtype=np.int64)
+        self.wins = np.zeros(n, dtype=bool)
+        self.losses = np.zeros(n, dtype=bool)
+        self.moves = np.zeros(n, dtype=np.int64)
+        self.rounds = 0
+
+    def _buildTables(self):
+        """
+        Per-cell lookup tables (cells are numbered x * height + y).
+        """
+        walls, width, height = self.layout.walls, self.width, self.height
+        numCells = width * height
+        self.possible = np.zeros((numCells, 5), dtype=bool)
+        table = self.layout.getActionTable()
+        for x in range(width):
+            for y in range(height):
+                for action in table.possibleActions[x * height + y]:
+                    self.possible[x * height + y, ACTIONS.index(action)] = True
+        # ghostLegal[cell, direction]: GhostRules.getLegalActions on a grid point
+        self.ghostLegal = np.zeros((numCells, 5, 5), dtype=bool)
+        moving = self.possible[:, :STOP]
+        for direction in range(5):
+            legal = np.concatenate([moving, np.zeros((numCells, 1), dtype=bool)], axis=1)
+            reverse = REVERSE[direction]
+            if reverse != STOP:
+                dropReverse = legal[:, reverse] & (legal.sum(axis=1) > 1)
+                legal[dropReverse, reverse] = False
+            self.ghostLegal[:, direction] = legal
+
+        self.foodCells = [x * height + y for x, y in self.layout.food.asList()]
+        self.foodIndex = np.full(numCells, -1, dtype=np.int64)
+        self.foodIndex[self.foodCells] = np.arange(len(self.foodCells))
+        numWords = max(1, (len(self.foodCells) + 63) // 64)
+        self.initialFood = np.zeros(numWords, dtype=np.uint64)
+        for i in range(len(self.foodCells)):
+            self.initialFood[i >> 6] |= np.uint64(1) << np.uint64(i & 63)
+
+        self.capsuleCells = [x * height + y for x, y in self.layout.capsules]
+        self.capsuleIndex = np.full(numCells, -1, dtype=np.int64)
+        if self.capsuleCells:
+            self.capsuleIndex[self.capsuleCells] = np.arange(len(self.capsuleCells))
+
+    def done(self):
+        return self.wins | self.losses
+
+    def pacmanLegal(self):
+        """
+        A (numGames, 5) boolean array of Pacman's legal actions per game.
+        """
+        return self.possible[self.pacmanX * self.height + self.pacmanY]
+
+    def ghostLegalActions(self, ghost):
+        """
+        A (numGames, 5) boolean array of a ghost's legal actions per game.
+        """
+        x2, y2 = self.ghostX2[:, ghost], self.ghostY2[:, ghost]
+        direction = self.ghostDir[:, ghost]
+        onGrid = ((x2 | y2) & 1) == 0
+        cells = (x2 // 2) * self.height + (y2 // 2)
+        legal = self.ghostLegal[cells, direction]
+        # In between grid points, ghosts must continue straight
+        between = np.zeros_like(legal)
+        between[np.arange(self.numGames), direction] = True
+        return np.where(onGrid[:, None], legal, between)
+
+    def run(self, pacmanPolicy):
+        """
+        Plays every game to the end and returns the results (see results()).
+        """
+        while self.step(pacmanPolicy):
+            pass
+        return self.results()
+
+    def step(self, pacmanPolicy):
+        """
+        Plays one round (Pacman, then every ghost) in all unfinished games.
+        Returns whether any game is still running.
+        """
+        active = ~self.done()
+        if not active.any() or self.rounds >= self.maxMoves:
+            return False
+        self._movePacman(active, np.asarray(pacmanPolicy(self)))
+        for ghost in range(self.numGhosts):
+            active = ~self.done()
+            if not active.any():
+                break
+            self._moveGhost(ghost, active)
+        self.rounds += 1
+        return bool((~self.done()).any()) and self.rounds < self.maxMoves
+
+    def _movePacman(self, active, actions):
+        games = np.nonzero(active)[0]
+        actions = actions[games]
+        legal = self.pacmanLegal()[games, actions]
+        if not legal.all():
+            raise Exception("Illegal action " + ACTIONS[actions[~legal][0]])
+        self.pacmanX[games] += ACTION_DX[actions]
+        self.pacmanY[games] += ACTION_DY[actions]
+        self.moves[games] += 1
+        cells = self.pacmanX[games] * self.height + self.pacmanY[games]
+
+        # Eat food
+        foodIndex = self.foodIndex[cells]
+        onFood = foodIndex >= 0
+        eating = games[onFood]
+        if len(eating):
+            words = foodIndex[onFood] >> 6
+            bits = np.left_shift(np.uint64(1), (foodIndex[onFood] & 63).astype(np.uint64))
+            hasFood = (self.food[eating, words] & bits) != 0
+            eating, words, bits = eating[hasFood], words[hasFood], bits[hasFood]
+            self.food[eating, words] &= ~bits
+            self.scores[eating] += 10
+            self.numFood[eating] -= 1
+            cleared = eating[(self.numFood[eating] == 0) & ~self.losses[eating]]
+            self.scores[cleared] += 500
+            self.wins[cleared] = True
+
+        # Eat capsules
+        capsuleIndex = self.capsuleIndex[cells]
+        onCapsule = capsuleIndex >= 0
+        if onCapsule.any():
+            candidates = games[onCapsule]
+            hasCapsule = self.capsules[candidates, capsuleIndex[onCapsule]]
+            eaten = candidates[hasCapsule]
+            self.capsules[eaten, capsuleIndex[onCapsule][hasCapsule]] = False
+            self.scaredTimers[eaten] = SCARED_TIME
+
+        self.scores[games] -= TIME_PENALTY
+        for ghost in range(self.numGhosts):
+            self._checkDeath(games, ghost)
+
+    def _moveGhost(self, ghost, active):
+        games = np.nonzero(active)[0]
+        legal = self.ghostLegalActions(ghost)[games]
+        if self.ghostPolicy == 'directional':
+            weights = self._directionalWeights(ghost, games, legal)
+        else:
+            weights = legal.astype(float)
+        actions = self._sample(weights)
+
+        scared = self.scaredTimers[games, ghost] > 0
+        speed = np.where(scared, 1, 2)
+        self.ghostX2[games, ghost] += ACTION_DX[actions] * speed
+        self.ghostY2[games, ghost] += ACTION_DY[actions] * speed
+        self.ghostDir[games, ghost] = np.where(actions == STOP, self.ghostDir[games, ghost], actions)
+        self.moves[games] += 1
+
+        # Time passes: a ghost whose fright ends snaps to the nearest grid point
+        timers = self.scaredTimers[games, ghost]
+        snap = games[timers == 1]
+        self.ghostX2[snap, ghost] = ((self.ghostX2[snap, ghost] + 1) // 2) * 2
+        self.ghostY2[snap, ghost] = ((self.ghostY2[snap, ghost] + 1) // 2) * 2
+        self.scaredTimers[games, ghost] = np.maximum(0, timers - 1)
+        self._checkDeath(games, ghost)
+
+    def _directionalWeights(self, ghost, games, legal):
+        """
+        DirectionalGhost.getDistribution for every game at once.
+        """
+        scared = self.scaredTimers[games, ghost] > 0
+        speed = np.where(scared, 1, 2)[:, None]
+        newX2 = self.ghostX2[games, ghost][:, None] + ACTION_DX[None, :] * speed
+        newY2 = self.ghostY2[games, ghost][:, None] + ACTION_DY[None, :] * speed
+        distances = (np.abs(newX2 - 2 * self.pacmanX[games][:, None]) +
+                     np.abs(newY2 - 2 * self.pacmanY[games][:, None]))
+        big = np.iinfo(np.int64).max
+        best = np.where(scared,
+                        np.where(legal, distances, -1).max(axis=1),
+                        np.where(legal, distances, big).min(axis=1))
+        isBest = legal & (distances == best[:, None])
+        bestProb = np.where(scared, self.prob_scaredFlee, self.prob_attack)[:, None]
+        numLegal = np.maximum(legal.sum(axis=1), 1)[:, None]
+        numBest = np.maximum(isBest.sum(axis=1), 1)[:, None]
+        return isBest * (bestProb / numBest) + legal * ((1 - bestProb) / numLegal)
+
+    def _sample(self, weights):
+        """
+        Draws one action per row of an unnormalized (games, 5) weight array.
+        Rows without weight (no legal action) stop, as GhostAgent does.
+        """
+        totals = weights.sum(axis=1)
+        cumulative = weights.cumsum(axis=1)
+        draws = self.random.random(len(weights)) * totals
+        above = cumulative > draws[:, None]
+        # Rounding can leave a draw past the last bucket; use the last legal action
+        lastLegal = STOP - np.argmax(weights[:, ::-1] > 0, axis=1)
+        actions = np.where(above.any(axis=1), np.argmax(above, axis=1), lastLegal)
+        return np.where(totals > 0, actions, STOP)
+
+    def _checkDeath(self, games, ghost):
+        """
+        GhostRules.checkDeath/collide for one ghost in the given games.
+        """
+        distance = (np.abs(self.ghostX2[games, ghost] - 2 * self.pacmanX[games]) +
+                    np.abs(self.ghostY2[games, ghost] - 2 * self.pacmanY[games]))
+        colliding = games[distance <= COLLISION_DISTANCE]
+        if not len(colliding):
+            return
+        scared = self.scaredTimers[colliding, ghost] > 0
+        eaten = colliding[scared]
+        self.scores[eaten] += 200
+        self.ghostX2[eaten, ghost] = self.ghostStarts2[ghost, 0]
+        self.ghostY2[eaten, ghost] = self.ghostStarts2[ghost, 1]
+        self.ghostDir[eaten, ghost] = STOP
+        self.scaredTimers[eaten, ghost] = 0
+        killed = colliding[~scared]
+        killed = killed[~self.wins[killed]]
+        self.scores[killed] -= 500
+        self.losses[killed] = True
+
+    def results(self):
+        """
+        Per-game arrays: final scores, wins, losses, agent moves and whether
+        the game was cut off by maxMoves.
+        """
+        return {'scores': self.scores.copy(), 'wins': self.wins.copy(),
+                'losses': self.losses.copy(), 'moves': self.moves.copy(),
+                'truncated': ~self.done()}
+
+
+def randomPacmanPolicy(sim):
+    """
+    Picks one of Pacman's legal actions (Stop included) uniformly at random.
+    """
+    return sim._sample(sim.pacmanLegal().astype(float))
+
+
+def randomMovePacmanPolicy(sim):
+    """
+    Like randomPacmanPolicy, but only stops when nothing else is legal.
+    """
+    legal = sim.pacmanLegal().copy()
+    canMove = legal[:, :STOP].any(axis=1)
+    legal[canMove, STOP] = False
+    return sim._sample(legal.astype(float))
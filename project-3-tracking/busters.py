@@ -257,7 +257,7 @@ class GameState:
         """
         Allows states to be keys of dictionaries.
         """
-        return hash( str( self ) )
+        return hash( self.data )
 
     def __str__( self ):
 
@@ -453,6 +453,8 @@ def readCommand( argv ):
     parser.add_option('-l', '--layout', dest='layout',
                       help=default('the LAYOUT_FILE from which to load the map layout'),
                       metavar='LAYOUT_FILE', default='oneHunt')
+    parser.add_option('--generate', dest='generate',
+                      help='Generate a random maze instead of loading a layout, e.g. "width=500,height=500,loopFactor=0.3,seed=1" (see layoutGenerator.py)', default=None)
     parser.add_option('-p', '--pacman', dest='pacman',
                       help=default('the agent TYPE in the pacmanAgents module to use'),
                       metavar='TYPE', default='BustersKeyboardAgent')
@@ -483,8 +485,14 @@ def readCommand( argv ):
     if options.fixRandomSeed: random.seed('bustersPacman')
 
     # Choose a layout
-    args['layout'] = layout.getLayout( options.layout )
-    if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
+    if options.generate != None:
+        import layoutGenerator
+        generatorArgs = layoutGenerator.parseGeneratorArgs( options.generate, {'numGhosts': options.numGhosts} )
+        args['layout'] = layoutGenerator.generateLayout( **generatorArgs )
+        options.numGhosts = args['layout'].getNumGhosts()
+    else:
+        args['layout'] = layout.getLayout( options.layout )
+        if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
 
     # Choose a ghost agent
     ghostType = loadAgent(options.ghost, options.quietGraphics)
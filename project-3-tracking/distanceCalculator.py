@@ -151,7 +151,9 @@ def computeDistances(layout):
         for node in allNodes:
             dist[node] = 1000000000
         import util
-        queue = util.PriorityQueue()
+        # Every step costs 1, so a bucket queue does; update keeps each
+        # node queued at most once
+        queue = util.BucketPriorityQueue()
         queue.push(source, 0)
         dist[source] = 0
         while not queue.isEmpty():
@@ -177,7 +179,7 @@ def computeDistances(layout):
                 newDist = nodeDist+1
                 if newDist < oldDist:
                     dist[other] = newDist
-                    queue.push(other, newDist)
+                    queue.update(other, newDist)
         for target in allNodes:
             distances[(target, source)] = dist[target]
     return distances
@@ -193,15 +193,7 @@ class Grid:
         return self.data == other.data
 
     def __hash__(self):
-        # return hash(str(self))
-        base = 1
-        h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
-        return hash(h)
+        return hash(tuple(map(tuple, self.data)))
 
     def copy(self):
         g = Grid(self.width, self.height)
@@ -391,6 +383,7 @@ class GameStateData:
         self._lose = False
         self._win = False
         self.scoreChange = 0
+        self._hash = None
 
     def deepCopy( self ):
         state = GameStateData( self )
@@ -408,6 +401,13 @@ class GameStateData:
             copiedStates.append( agentState.copy() )
         return copiedStates
 
+    def setAgentState( self, index, agentState ):
+        """
+        Replaces the state of one agent, dropping the cached hash.
+        """
+        self.agentStates[index] = agentState
+        self._hash = None
+
     def __eq__( self, other ):
         """
         Allows two states to be compared.
@@ -422,15 +422,14 @@ class GameStateData:
 
     def __hash__( self ):
         """
-        Allows states to be keys of dictionaries.
+        Allows states to be keys of dictionaries.  The hash is computed the
+        first time it is asked for and kept, so a state must not be changed
+        once it has been hashed, other than through setAgentState (the rules
+        only change the successors they are building).
         """
-        for i, state in enumerate( self.agentStates ):
-            try:
-                int(hash(state))
-            except TypeError as e:
-                print(e)
-                #hash(state)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
+        if self._hash is None:
+            self._hash = int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
+        return self._hash
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
@@ -544,24 +543,16 @@ class Game:
         self.agentCrashed = True
         self.rules.agentCrash(self, agentIndex)
 
-    OLD_STDOUT = None
-    OLD_STDERR = None
-
+    # Agents print to their own output through a redirection local to the
+    # thread playing the game, so concurrent games do not swap each
+    # other's streams
     def mute(self, agentIndex):
         if not self.muteAgents: return
-        global OLD_STDOUT, OLD_STDERR
-        import io
-        OLD_STDOUT = sys.stdout
-        OLD_STDERR = sys.stderr
-        sys.stdout = self.agentOutput[agentIndex]
-        sys.stderr = self.agentOutput[agentIndex]
+        redirectOutput(self.agentOutput[agentIndex])
 
     def unmute(self):
         if not self.muteAgents: return
-        global OLD_STDOUT, OLD_STDERR
-        # Revert stdout/stderr to originals
-        sys.stdout = OLD_STDOUT
-        sys.stderr = OLD_STDERR
+        redirectOutput(None)
 
 
     def run( self ):
@@ -209,7 +209,7 @@ class GameState:
         """
         Allows states to be keys of dictionaries.
         """
-        return hash( str( self ) )
+        return hash( self.data )
 
     def __str__( self ):
 
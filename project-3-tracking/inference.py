@@ -507,7 +507,7 @@ class InferenceModule:
         functioning of observe.
         """
         conf = game.Configuration(ghostPosition, game.Directions.STOP)
-        gameState.data.agentStates[index] = game.AgentState(conf, False)
+        gameState.data.setAgentState(index, game.AgentState(conf, False))
         return gameState
 
     def setGhostPositions(self, gameState, ghostPositions):
@@ -516,7 +516,7 @@ class InferenceModule:
         """
         for index, pos in enumerate(ghostPositions):
             conf = game.Configuration(pos, game.Directions.STOP)
-            gameState.data.agentStates[index + 1] = game.AgentState(conf, False)
+            gameState.data.setAgentState(index + 1, game.AgentState(conf, False))
         return gameState
 
     def observe(self, gameState):
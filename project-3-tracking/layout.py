@@ -16,7 +16,6 @@ from util import manhattanDistance
 from game import Grid
 import os
 import random
-from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
 
@@ -36,31 +35,20 @@ class Layout:
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
-        # self.initializeVisibilityMatrix()
+        # Built on the first isVisibleFrom call
+        self.visibility = None
 
     def getNumGhosts(self):
         return self.numGhosts
 
     def initializeVisibilityMatrix(self):
-        global VISIBILITY_MATRIX_CACHE
-        if reduce(str.__add__, self.layoutText) not in VISIBILITY_MATRIX_CACHE:
-            from game import Directions
-            vecs = [(-0.5,0), (0.5,0),(0,-0.5),(0,0.5)]
-            dirs = [Directions.NORTH, Directions.SOUTH, Directions.WEST, Directions.EAST]
-            vis = Grid(self.width, self.height, {Directions.NORTH:set(), Directions.SOUTH:set(), Directions.EAST:set(), Directions.WEST:set(), Directions.STOP:set()})
-            for x in range(self.width):
-                for y in range(self.height):
-                    if self.walls[x][y] == False:
-                        for vec, direction in zip(vecs, dirs):
-                            dx, dy = vec
-                            nextx, nexty = x + dx, y + dy
-                            while (nextx + nexty) != int(nextx) + int(nexty) or not self.walls[int(nextx)][int(nexty)] :
-                                vis[x][y][direction].add((nextx, nexty))
-                                nextx, nexty = x + dx, y + dy
-            self.visibility = vis
-            VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)] = vis
-        else:
-            self.visibility = VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)]
+        """
+        Sets self.visibility to the VisibilityIndex of these walls.  Layouts
+        with the same walls share one index.
+        """
+        if self.walls not in VISIBILITY_MATRIX_CACHE:
+            VISIBILITY_MATRIX_CACHE[self.walls.copy()] = VisibilityIndex(self.walls)
+        self.visibility = VISIBILITY_MATRIX_CACHE[self.walls]
 
     def isWall(self, pos):
         x, col = pos
@@ -84,8 +72,9 @@ class Layout:
         return pos
 
     def isVisibleFrom(self, ghostPos, pacPos, pacDirection):
-        row, col = [int(x) for x in pacPos]
-        return ghostPos in self.visibility[row][col][pacDirection]
+        if self.visibility is None:
+            self.initializeVisibilityMatrix()
+        return self.visibility.isVisible(ghostPos, pacPos, pacDirection)
 
     def __str__(self):
         return "\n".join(self.layoutText)
@@ -129,6 +118,78 @@ class Layout:
         elif layoutChar in  ['1', '2', '3', '4']:
             self.agentPositions.append( (int(layoutChar), (x,y)))
             self.numGhosts += 1
+
+
+class VisibilityIndex:
+    """
+    Straight lines of sight through a maze.  An agent sees the cells and the
+    half-way points between them along its heading, up to the first wall.
+    For every cell and heading, the index keeps how many half-steps away the
+    last visible position is, so checking a position is a comparison.
+    Looking Stop, or from inside a wall, sees nothing.
+    """
+
+    def __init__(self, walls):
+        from game import Directions
+        width, height = walls.width, walls.height
+        self.height = height
+        self.steps = {Directions.NORTH: (0, 1), Directions.SOUTH: (0, -1),
+                      Directions.EAST: (1, 0), Directions.WEST: (-1, 0)}
+        # reach[direction][x * height + y] is the sight range from (x, y)
+        self.reach = {Directions.STOP: [0] * (width * height)}
+        for direction, (dx, dy) in self.steps.items():
+            reach = [0] * (width * height)
+            # Walk each line against the heading, so that the open run ahead
+            # of a cell is already known
+            xs = range(width - 1, -1, -1) if dx > 0 else range(width)
+            ys = range(height - 1, -1, -1) if dy > 0 else range(height)
+            for x in xs:
+                for y in ys:
+                    if walls[x][y]:
+                        continue
+                    nx, ny = x + dx, y + dy
+                    if 0 <= nx < width and 0 <= ny < height:
+                        if walls[nx][ny]:
+                            # Up to the half-way point before the wall
+                            reach[x * height + y] = 1
+                        else:
+                            reach[x * height + y] = reach[nx * height + ny] + 2
+                    elif 0 <= 2 * x + dx and 0 <= 2 * y + dy:
+                        # The half-way point at the far edge of the board
+                        reach[x * height + y] = 1
+            self.reach[direction] = reach
+
+    def isVisible(self, position, fromPosition, direction):
+        """
+        Whether position is in sight from fromPosition looking in direction.
+        """
+        if direction not in self.steps:
+            return False
+        x2, y2 = position[0] * 2, position[1] * 2
+        x, y = int(fromPosition[0]), int(fromPosition[1])
+        dx, dy = self.steps[direction]
+        if dx:
+            if y2 != 2 * y:
+                return False
+            steps = (x2 - 2 * x) * dx
+        else:
+            if x2 != 2 * x:
+                return False
+            steps = (y2 - 2 * y) * dy
+        return steps == int(steps) and 0 < steps <= self.reach[direction][x * self.height + y]
+
+    def getVisiblePositions(self, fromPosition, direction):
+        """
+        The positions in sight from fromPosition, nearest first.
+        """
+        x, y = int(fromPosition[0]), int(fromPosition[1])
+        reach = self.reach[direction][x * self.height + y]
+        if reach == 0:
+            return []
+        dx, dy = self.steps[direction]
+        return [(x + steps * dx / 2.0, y + steps * dy / 2.0) for steps in range(1, reach + 1)]
+
+
 def getLayout(name, back = 2):
     if name.endswith('.lay'):
         layout = tryToLoad('layouts/' + name)
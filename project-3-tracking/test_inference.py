@@ -0,0 +1,55 @@
+# test_inference.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Tests for the inference modules.  Run them from this directory with
+
+  > python -m unittest test_inference
+"""
+
+import unittest
+
+import busters
+import layout
+from bustersGhostAgents import StationaryGhost
+from inference import ExactInference
+
+
+class SetGhostPositionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.state = busters.GameState()
+        self.state.initialize(layout.getLayout('smallHunt'), 2)
+        self.inference = ExactInference(StationaryGhost(1))
+
+    def assertHashIsCurrent(self, state):
+        rebuilt = state.deepCopy()
+        self.assertEqual(state, rebuilt)
+        self.assertEqual(hash(rebuilt), hash(state))
+
+    def testSetGhostPositionDropsCachedHash(self):
+        before = hash(self.state)
+        moved = self.inference.setGhostPosition(self.state, (1, 1), 1)
+        self.assertHashIsCurrent(moved)
+        self.assertNotEqual(before, hash(moved))
+
+    def testSetGhostPositionsDropsCachedHash(self):
+        before = hash(self.state)
+        moved = self.inference.setGhostPositions(self.state, [(1, 1), (1, 2)])
+        self.assertHashIsCurrent(moved)
+        self.assertNotEqual(before, hash(moved))
+
+
+if __name__ == '__main__':
+    unittest.main()
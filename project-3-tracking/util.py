@@ -28,6 +28,7 @@
 
 import sys
 import inspect
+import collections
 import heapq, random
 import io
 
@@ -148,26 +149,40 @@ class Stack:
         "Returns true if the stack is empty"
         return len(self.list) == 0
 
+    def extend(self, items):
+        "Push every item in items, in order"
+        self.list.extend(items)
+
+    def __len__(self):
+        return len(self.list)
+
 class Queue:
     "A container with a first-in-first-out (FIFO) queuing policy."
     def __init__(self):
-        self.list = []
+        self.list = collections.deque()
 
     def push(self,item):
         "Enqueue the 'item' into the queue"
-        self.list.insert(0,item)
+        self.list.append(item)
 
     def pop(self):
         """
           Dequeue the earliest enqueued item still in the queue. This
           operation removes the item from the queue.
         """
-        return self.list.pop()
+        return self.list.popleft()
 
     def isEmpty(self):
         "Returns true if the queue is empty"
         return len(self.list) == 0
 
+    def extend(self, items):
+        "Enqueue every item in items, in order"
+        self.list.extend(items)
+
+    def __len__(self):
+        return len(self.list)
+
 class PriorityQueue:
     """
       Implements a priority queue data structure. Each inserted item
@@ -191,6 +206,21 @@ class PriorityQueue:
     def isEmpty(self):
         return len(self.heap) == 0
 
+    def extend(self, entries):
+        "Push every (item, priority) pair in entries, in order"
+        entries = [(priority, self.count + i, item) for i, (item, priority) in enumerate(entries)]
+        self.count += len(entries)
+        if len(entries) > len(self.heap):
+            # Rebuilding the heap is linear, cheaper than pushing one by one
+            self.heap.extend(entries)
+            heapq.heapify(self.heap)
+        else:
+            for entry in entries:
+                heapq.heappush(self.heap, entry)
+
+    def __len__(self):
+        return len(self.heap)
+
     def update(self, item, priority):
         # If item already in priority queue with higher priority, update its priority and rebuild the heap.
         # If item already in priority queue with equal or lower priority, do nothing.
@@ -222,6 +252,193 @@ class PriorityQueueWithFunction(PriorityQueue):
         "Adds an item to the queue with priority from the priority function"
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
+    def extend(self, items):
+        "Adds every item in items with priority from the priority function"
+        PriorityQueue.extend(self, [(item, self.priorityFunction(item)) for item in items])
+
+
+class IndexedPriorityQueue:
+    """
+    A priority queue holding each item at most once, with a map from every
+    item to its slot in the heap.  This makes update, remove and getPriority
+    O(log n) or better (contains is O(1)), where PriorityQueue.update scans
+    the whole heap.  Items must be hashable.  As in PriorityQueue, items of
+    equal priority come out in the order they were pushed.
+    """
+    def __init__(self):
+        self.heap = []
+        self.positions = {}
+        self.count = 0
+
+    def push(self, item, priority):
+        "Adds item; if it is already queued, its priority becomes priority"
+        if item in self.positions:
+            self._replace(self.positions[item], priority, self.count)
+        else:
+            self.heap.append((priority, self.count, item))
+            self.positions[item] = len(self.heap) - 1
+            self._siftUp(len(self.heap) - 1)
+        self.count += 1
+
+    def pop(self):
+        "Removes and returns the item of lowest priority"
+        last = self.heap.pop()
+        if not self.heap:
+            del self.positions[last[2]]
+            return last[2]
+        (_, _, item) = self.heap[0]
+        del self.positions[item]
+        self.heap[0] = last
+        self.positions[last[2]] = 0
+        self._siftDown(0)
+        return item
+
+    def peek(self):
+        "Returns the item of lowest priority without removing it"
+        return self.heap[0][2]
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def update(self, item, priority):
+        # Same as PriorityQueue.update: lowers the priority of a queued item,
+        # leaves it alone if it already has an equal or lower priority, and
+        # pushes an item that is not queued.
+        index = self.positions.get(item)
+        if index is None:
+            self.push(item, priority)
+        elif priority < self.heap[index][0]:
+            self._replace(index, priority, self.heap[index][1])
+
+    def remove(self, item):
+        "Takes item out of the queue"
+        index = self.positions.pop(item)
+        last = self.heap.pop()
+        if index < len(self.heap):
+            self.heap[index] = last
+            self.positions[last[2]] = index
+            self._siftUp(index)
+            self._siftDown(self.positions[last[2]])
+
+    def contains(self, item):
+        return item in self.positions
+
+    def getPriority(self, item):
+        return self.heap[self.positions[item]][0]
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _replace(self, index, priority, count):
+        item = self.heap[index][2]
+        self.heap[index] = (priority, count, item)
+        self._siftUp(index)
+        self._siftDown(self.positions[item])
+
+    def _siftUp(self, index):
+        heap, positions = self.heap, self.positions
+        entry = heap[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if not entry < heap[parent]:
+                break
+            heap[index] = heap[parent]
+            positions[heap[index][2]] = index
+            index = parent
+        heap[index] = entry
+        positions[entry[2]] = index
+
+    def _siftDown(self, index):
+        heap, positions = self.heap, self.positions
+        size = len(heap)
+        entry = heap[index]
+        child = 2 * index + 1
+        while child < size:
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            if not heap[child] < entry:
+                break
+            heap[index] = heap[child]
+            positions[heap[index][2]] = index
+            index = child
+            child = 2 * index + 1
+        heap[index] = entry
+        positions[entry[2]] = index
+
+
+class BucketPriorityQueue:
+    """
+    An IndexedPriorityQueue for small non-negative integer priorities, such
+    as path lengths in a maze.  Bucket p holds the items of priority p in
+    the order they were pushed, so push is O(1) and pop is O(1) plus the
+    number of empty buckets it skips.  An item whose priority changes goes
+    behind the items already in its new bucket, and leaves a dead entry in
+    its old bucket for pop to discard.
+    """
+    def __init__(self):
+        self.buckets = []
+        # The live entry ([item], a one-element list) and priority of every queued item
+        self.entries = {}
+        # No bucket below lowest holds a live entry
+        self.lowest = 0
+
+    def push(self, item, priority):
+        "Adds item; if it is already queued, its priority becomes priority"
+        bucket = int(priority)
+        if bucket != priority or bucket < 0:
+            raise Exception('BucketPriorityQueue priorities are non-negative integers, not ' + str(priority))
+        if item in self.entries:
+            self.entries[item][0].pop()
+        while len(self.buckets) <= bucket:
+            self.buckets.append(collections.deque())
+        entry = [item]
+        self.buckets[bucket].append(entry)
+        self.entries[item] = (entry, bucket)
+        if bucket < self.lowest:
+            self.lowest = bucket
+
+    def pop(self):
+        "Removes and returns the item of lowest priority"
+        if not self.entries:
+            raise IndexError('pop from an empty priority queue')
+        buckets = self.buckets
+        while True:
+            bucket = buckets[self.lowest]
+            while bucket:
+                entry = bucket.popleft()
+                if entry:
+                    del self.entries[entry[0]]
+                    return entry[0]
+            self.lowest += 1
+
+    def isEmpty(self):
+        return len(self.entries) == 0
+
+    def update(self, item, priority):
+        # Same as PriorityQueue.update
+        if item not in self.entries or priority < self.entries[item][1]:
+            self.push(item, priority)
+
+    def remove(self, item):
+        "Takes item out of the queue"
+        entry, bucket = self.entries.pop(item)
+        entry.pop()
+
+    def contains(self, item):
+        return item in self.entries
+
+    def getPriority(self, item):
+        return self.entries[item][1]
+
+    def __contains__(self, item):
+        return item in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
 
 def manhattanDistance( xy1, xy2 ):
     "Returns the Manhattan distance between points xy1 and xy2"
@@ -608,6 +825,7 @@ def pause():
 # this have all student code so wrapped.
 #
 import signal
+import threading
 import time
 class TimeoutFunctionException(Exception):
     """Exception to raise on a timeout"""
@@ -615,33 +833,98 @@ class TimeoutFunctionException(Exception):
 
 
 class TimeoutFunction:
-    def __init__(self, function, timeout):
+    """
+    Calls function, raising TimeoutFunctionException if it runs for longer
+    than timeout seconds.  As with signal.alarm, a timeout of 0 means no
+    limit.
+
+    SIGALRM can only be used from the main thread, one alarm at a time.  Off
+    the main thread (e.g. when several games share a thread pool), or where
+    SIGALRM does not exist, the call runs in a supervised worker thread that
+    the caller stops waiting for at the deadline.  useSignals forces either
+    backend.
+
+    Threads cannot be killed, so a call that times out this way keeps running
+    in the background and its result is dropped.  Each calling thread (so
+    each game, when games run in threads of their own) may leave at most
+    MAX_RUNAWAY_CALLS of them running: while it has that many, its further
+    supervised calls time out at once instead of starting another worker.
+    Other threads are not affected.
+    """
+
+    MAX_RUNAWAY_CALLS = 4
+    # The workers of the calling thread's supervised calls that timed out,
+    # while they still run
+    _runaways = threading.local()
+
+    def __init__(self, function, timeout, useSignals=None):
         self.timeout = timeout
         self.function = function
+        self.useSignals = useSignals
 
     def handle_timeout(self, signum, frame):
         raise TimeoutFunctionException()
 
+    def runawayWorkers():
+        """
+        The workers of the current thread's timed-out calls still running.
+        """
+        local = TimeoutFunction._runaways
+        if not hasattr(local, 'workers'):
+            local.workers = []
+        local.workers[:] = [worker for worker in local.workers if worker.is_alive()]
+        return local.workers
+    runawayWorkers = staticmethod(runawayWorkers)
+
     def __call__(self, *args, **keyArgs):
-        # If we have SIGALRM signa, use it to cause an exception if and
-        # when this function runs too long.  Otherwise check the time taken
-        # after the method has returned, and throw an exception then.
-        if hasattr(signal, 'SIGALRM'):
-            old = signal.signal(signal.SIGALRM, self.handle_timeout)
-            signal.alarm(self.timeout)
-            try:
-                result = self.function(*args, **keyArgs)
-            finally:
-                signal.signal(signal.SIGALRM, old)
-            signal.alarm(0)
-        else:
-            startTime = time.time()
+        useSignals = self.useSignals
+        if useSignals == None:
+            useSignals = hasattr(signal, 'SIGALRM') and \
+                threading.current_thread() is threading.main_thread()
+        if not useSignals:
+            return self.callSupervised(*args, **keyArgs)
+        # Use SIGALRM to cause an exception if and when this function runs
+        # too long.
+        old = signal.signal(signal.SIGALRM, self.handle_timeout)
+        signal.alarm(self.timeout)
+        try:
             result = self.function(*args, **keyArgs)
-            timeElapsed = time.time() - startTime
-            if timeElapsed >= self.timeout:
-                self.handle_timeout(None, None)
+        finally:
+            signal.signal(signal.SIGALRM, old)
+        signal.alarm(0)
         return result
 
+    def callSupervised(self, *args, **keyArgs):
+        """
+        Runs the function in a worker thread and waits until the deadline.
+        The worker prints wherever the calling thread does.
+        """
+        if self.timeout == 0:
+            return self.function(*args, **keyArgs)
+        runaways = TimeoutFunction.runawayWorkers()
+        if len(runaways) >= TimeoutFunction.MAX_RUNAWAY_CALLS:
+            self.handle_timeout(None, None)
+        outcome = {}
+        output = outputRedirect()
+
+        def run():
+            if output != None:
+                redirectOutput(output)
+            try:
+                outcome['result'] = self.function(*args, **keyArgs)
+            except BaseException as error:
+                outcome['error'] = error
+        worker = threading.Thread(target=run)
+        worker.daemon = True
+        worker.start()
+        worker.join(max(0, self.timeout))
+        if worker.is_alive():
+            runaways.append(worker)
+            self.handle_timeout(None, None)
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['result']
+
 
 
 _ORIGINAL_STDOUT = None
@@ -672,3 +955,57 @@ def unmutePrint():
     sys.stdout = _ORIGINAL_STDOUT
     #sys.stderr = _ORIGINAL_STDERR
 
+
+class ThreadLocalStream:
+    """
+    Stands in for sys.stdout or sys.stderr, passing what is written on to the
+    stream the writing thread redirected its output to, or else to the stream
+    it replaced.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def target(self):
+        redirected = getattr(self.local, 'stream', None)
+        if redirected != None:
+            return redirected
+        return self.stream
+
+    def write(self, string):
+        return self.target().write(string)
+
+    def flush(self):
+        target = self.target()
+        if hasattr(target, 'flush'):
+            target.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.target(), name)
+
+
+_REDIRECT_LOCK = threading.Lock()
+
+
+def redirectOutput(stream):
+    """
+    Sends what the current thread prints to stdout and stderr to stream, or
+    back to the real streams if stream is None, leaving other threads alone.
+    The first call installs ThreadLocalStreams as sys.stdout and sys.stderr.
+    """
+    with _REDIRECT_LOCK:
+        if not isinstance(sys.stdout, ThreadLocalStream):
+            sys.stdout = ThreadLocalStream(sys.stdout)
+        if not isinstance(sys.stderr, ThreadLocalStream):
+            sys.stderr = ThreadLocalStream(sys.stderr)
+    sys.stdout.local.stream = stream
+    sys.stderr.local.stream = stream
+
+
+def outputRedirect():
+    "The stream the current thread's output is redirected to, or None"
+    if isinstance(sys.stdout, ThreadLocalStream):
+        return getattr(sys.stdout.local, 'stream', None)
+    return None
+
@@ -582,26 +582,18 @@ class Game:
         self.agentCrashed = True
         self.rules.agentCrash(self, agentIndex)
 
-    OLD_STDOUT = None
-    OLD_STDERR = None
-
+    # Agents print to their own output through a redirection local to the
+    # thread playing the game, so concurrent games do not swap each
+    # other's streams
     def mute(self, agentIndex):
         if not self.muteAgents:
             return
-        global OLD_STDOUT, OLD_STDERR
-        import io
-        OLD_STDOUT = sys.stdout
-        OLD_STDERR = sys.stderr
-        sys.stdout = self.agentOutput[agentIndex]
-        sys.stderr = self.agentOutput[agentIndex]
+        redirectOutput(self.agentOutput[agentIndex])
 
     def unmute(self):
         if not self.muteAgents:
             return
-        global OLD_STDOUT, OLD_STDERR
-        # Revert stdout/stderr to originals
-        sys.stdout = OLD_STDOUT
-        sys.stderr = OLD_STDERR
+        redirectOutput(None)
 
     def run(self):
         """
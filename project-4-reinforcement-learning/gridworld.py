@@ -318,6 +318,18 @@ def getMazeGrid():
             ['S',' ',' ',' ']]
     return Gridworld(grid)
 
+def getGeneratedGrid(generatorArgs):
+    """
+    A grid on a random maze from layoutGenerator.LayoutGenerator(**generatorArgs).
+    Pacman's cell is the start, capsules are exits worth +1 and ghosts are
+    exits worth -1; food is ignored.
+    """
+    import layoutGenerator
+    symbols = {'%': '#', 'P': 'S', 'o': +1, 'G': -1}
+    text = layoutGenerator.LayoutGenerator(**generatorArgs).getLayoutText()
+    grid = [[symbols.get(el, ' ') for el in line] for line in text]
+    return Gridworld(grid)
+
 
 
 def getUserAction(state, actionFunction):
@@ -411,6 +423,9 @@ def parseOptions():
     optParser.add_option('-g', '--grid',action='store',
                          metavar="G", type='string',dest='grid',default="BookGrid",
                          help='Grid to use (case sensitive; options are BookGrid, BridgeGrid, CliffGrid, MazeGrid, default %default)' )
+    optParser.add_option('--generate',action='store',
+                         metavar="SPEC", type='string',dest='generate',default=None,
+                         help='Use a random maze instead of a grid, e.g. "width=21,height=11,seed=1" (see layoutGenerator.py)' )
     optParser.add_option('-w', '--windowSize', metavar="X", type='int',dest='gridSize',default=150,
                          help='Request a window width of X pixels *per grid cell* (default %default)')
     optParser.add_option('-a', '--agent',action='store', metavar="A",
@@ -461,8 +476,12 @@ if __name__ == '__main__':
     ###########################
 
     import gridworld
-    mdpFunction = getattr(gridworld, "get"+opts.grid)
-    mdp = mdpFunction()
+    if opts.generate != None:
+        import layoutGenerator
+        mdp = gridworld.getGeneratedGrid(layoutGenerator.parseGeneratorArgs(opts.generate))
+    else:
+        mdpFunction = getattr(gridworld, "get"+opts.grid)
+        mdp = mdpFunction()
     mdp.setLivingReward(opts.livingReward)
     mdp.setNoise(opts.noise)
     env = gridworld.GridworldEnvironment(mdp)
@@ -524,6 +524,8 @@ def readCommand(argv):
                       help=default(
                           'the LAYOUT_FILE from which to load the map layout'),
                       metavar='LAYOUT_FILE', default='mediumClassic')
+    parser.add_option('--generate', dest='generate',
+                      help='Generate a random maze instead of loading a layout, e.g. "width=500,height=500,loopFactor=0.3,seed=1" (see layoutGenerator.py)', default=None)
     parser.add_option('-p', '--pacman', dest='pacman',
                       help=default(
                           'the agent TYPE in the pacmanAgents module to use'),
@@ -567,9 +569,16 @@ def readCommand(argv):
         random.seed('cs188')
 
     # Choose a layout
-    args['layout'] = layout.getLayout(options.layout)
-    if args['layout'] == None:
-        raise Exception("The layout " + options.layout + " cannot be found")
+    if options.generate != None:
+        import layoutGenerator
+        generatorArgs = layoutGenerator.parseGeneratorArgs(
+            options.generate, {'numGhosts': options.numGhosts})
+        args['layout'] = layoutGenerator.generateLayout(**generatorArgs)
+        options.numGhosts = args['layout'].getNumGhosts()
+    else:
+        args['layout'] = layout.getLayout(options.layout)
+        if args['layout'] == None:
+            raise Exception("The layout " + options.layout + " cannot be found")
 
     args['horizon'] = options.maxHorizon
 